@@ -1,19 +1,66 @@
 import os
 import dash
+import flask
 from dash import dcc, html, dash_table
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+import orjson
 from dash.dependencies import Input, Output, State
 import base64
 import io
 import re
+import json
+import hashlib
+import tempfile
+import threading
+import time
+import uuid
+import bisect
+import contextvars
+import cProfile
+import functools
+import heapq
+import contextlib
+import queue
+import fcntl
+import shutil
+import atexit
+import socket
+from datetime import datetime
+import multiprocessing
+from collections import Counter, OrderedDict
+from urllib.parse import urlencode
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from dateutil.parser import parse
 import dash_bootstrap_components as dbc
 from dash.dash_table.Format import Format, Scheme, Group
 
+try:
+    # Optional Rust-based Excel reader, much faster than xlrd/openpyxl
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# Encode figures and callback responses with orjson rather than the stdlib json module
+pio.json.config.default_engine = 'orjson'
+
 # Initialize app with a professional theme
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
+# Browser render timing (assets/render_timing.js posting to /client-metrics) is
+# opt-in: it adds a request per callback and accepts unauthenticated samples
+CLIENT_TIMING = os.environ.get('CLIENT_TIMING', '') == '1'
+
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True,
+                assets_ignore='' if CLIENT_TIMING else r'render_timing\.js')
+
+# WSGI entry point for production servers, e.g. `gunicorn app:server` (see Procfile)
+server = app.server
 
 # Define volume columns for Total Volume calculation
 volume_columns = [
@@ -21,6 +68,12 @@ volume_columns = [
     'PIN DEB Vol', 'VISA MC REF vol', 'MCP Volume'
 ]
 
+# Dollar amount columns, stored as integer cents or float32 in compact month frames
+money_columns = volume_columns + ['Agent Net', 'Total Volume']
+
+# Columns read from the PPI sheet; everything else in the workbook is skipped
+ppi_columns = ['MID', 'DBA Name', 'Agent Net'] + volume_columns
+
 # Define base columns that are always available
 base_mid_columns = [
     {'name': 'MID', 'id': 'MID', 'type': 'text'},
@@ -47,9 +100,64 @@ base_mid_columns = [
      'format': Format(symbol_prefix="$", precision=2, scheme=Scheme.fixed, group=Group.yes)}
 ]
 
+# Rows per chunk when streaming CSV exports
+EXPORT_CHUNK_ROWS = 10000
+
+# Rows per page of the MID table
+MID_TABLE_PAGE_SIZE = 15
+
+# Rows kept by the 'Top N by Volume' filter preset
+TOP_VOLUME_ROWS = 100
+
+# Above this many selected columns the MID table switches to its wide mode:
+# virtualized rows, frozen MID columns and cell colours sent as CSS classes
+WIDE_TABLE_COLUMNS = int(os.environ.get('WIDE_TABLE_COLUMNS', 24))
+WIDE_TABLE_PAGE_SIZE = 100
+
 # Default visible columns
 default_visible_columns = ['MID', 'DBA Name', 'Total Volume', 'Agent Net', 'Gross Margin %']
 
+# Server-side dataset store settings
+DATA_DIR = os.environ.get('DATA_DIR', os.path.join(tempfile.gettempdir(), 'merchant-dashboard'))
+DATASET_MEMORY_MB = int(os.environ.get('DATASET_MEMORY_MB', 512))
+PARSE_CACHE_MB = int(os.environ.get('PARSE_CACHE_MB', 2048))
+# Version of the cleaned month frames, summary rows and figures kept under
+# DATA_DIR. Bump it whenever clean_data, compact_month/compact_money,
+# summarize_month, build_dashboard_figures or the month dtype schema change,
+# so entries built by the old code are not served.
+# It is part of every upload's content hash; the warehouse keeps months stored
+# under older versions, since they cannot be rebuilt without the upload.
+CACHE_VERSION = 1
+# Size cap of the shared on-disk cache of summaries and figures
+SHARED_CACHE_MB = int(os.environ.get('SHARED_CACHE_MB', 256))
+# Sessions (and their warehouse months) unused for this long are deleted
+SESSION_MAX_AGE_DAYS = float(os.environ.get('SESSION_MAX_AGE_DAYS', 30))
+# Memory for artifacts derived from month frames (margin matrices, MID views,
+# presence matrices), split between their caches
+ARTIFACT_MEMORY_MB = int(os.environ.get('ARTIFACT_MEMORY_MB', 512))
+
+# Read size when spooling /upload request bodies to disk
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Keep cProfile dumps of the N slowest callback calls (0 disables profiling)
+PROFILE_SLOWEST = int(os.environ.get('PROFILE_SLOWEST', 0))
+
+# Number of worker processes used to parse uploaded files in parallel
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', os.cpu_count() or 1))
+
+# How often the browser polls a background ingest job for progress
+INGEST_POLL_MS = 500
+
+# A running job republishes its state every INGEST_HEARTBEAT_SECONDS. One
+# whose state is older than INGEST_HEARTBEAT_TIMEOUT lost its server process
+# (recycled or killed) and is reported as failed. The timeout leaves room for
+# heartbeats delayed by parsing and cleaning holding the GIL in the same process.
+INGEST_HEARTBEAT_SECONDS = 1
+INGEST_HEARTBEAT_TIMEOUT = 10
+
+# State of ingest jobs untouched for this many seconds is deleted
+INGEST_JOB_MAX_AGE = 86400
+
 # Custom styles
 CARD_STYLE = {
     'box-shadow': '0 4px 6px 0 rgba(0, 0, 0, 0.1)',
@@ -86,7 +194,21 @@ app.layout = html.Div([
                             ),
                             multiple=True
                         ),
-                    ], width=6),
+                    ], width=4),
+                    dbc.Col([
+                        # Streams files straight to the /upload endpoint (assets/stream_upload.js)
+                        html.Div(
+                            dbc.Button(
+                                [html.I(className="fas fa-cloud-upload-alt me-2"), "Upload Large Files"],
+                                id='stream-upload-button',
+                                color="primary",
+                                outline=True,
+                                size="lg"
+                            ),
+                            **{'data-upload-url': app.get_relative_path('/upload')}
+                        ),
+                        dcc.Store(id='stream-upload-result'),
+                    ], width=4),
                     dbc.Col([
                         dbc.Button(
                             [html.I(className="fas fa-trash me-2"), "Clear All Files"],
@@ -94,13 +216,29 @@ app.layout = html.Div([
                             color="danger",
                             size="lg"
                         ),
-                    ], width=6),
+                    ], width=4),
                 ]),
                 html.Div(id='file-list', className='mt-3'),
+                dbc.Collapse([
+                    html.Div(id='ingest-progress'),
+                    dbc.Button(
+                        [html.I(className="fas fa-times me-2"), "Cancel Upload"],
+                        id='cancel-ingest-button',
+                        color="secondary",
+                        outline=True,
+                        size="sm"
+                    ),
+                ], id='ingest-status', is_open=False, className='mt-3'),
+                dcc.Interval(id='ingest-poll', interval=INGEST_POLL_MS, disabled=True),
+                # Ids of the background ingest jobs started from this page, oldest first,
+                # and what update_data has merged and cleaned up of them
+                dcc.Store(id='ingest-jobs'),
+                dcc.Store(id='ingest-acks'),
             ])
         ], className="mb-4"),
         
-        dcc.Store(id='stored-data'),
+        # Kept in the browser's local storage so a reload reopens the same session
+        dcc.Store(id='stored-data', storage_type='local'),
         dcc.Store(id='available-columns-store'),
         
         # KPI Cards Summary
@@ -109,11 +247,28 @@ app.layout = html.Div([
         # Summary section with enhanced table
         html.Div(id='summary-section', className='mb-4'),
         
-        # Charts section
-        html.Div(id='charts-section', className='mb-4'),
+        # Charts and cohort sections are built only once their card is opened
+        dbc.Card([
+            dbc.CardHeader(
+                dbc.Button([html.I(className="fas fa-chart-bar me-2"), "Trend Charts"],
+                           id='charts-toggle', color="link", className="p-0 text-decoration-none")
+            ),
+            dbc.Collapse(
+                dbc.CardBody(dcc.Loading(html.Div(id='charts-section'))),
+                id='charts-collapse', is_open=False
+            ),
+        ], className='mb-4'),
         
-        # Store for filtered data
-        dcc.Store(id='filtered-mid-data'),
+        dbc.Card([
+            dbc.CardHeader(
+                dbc.Button([html.I(className="fas fa-users me-2"), "MID Cohorts & Retention"],
+                           id='cohort-toggle', color="link", className="p-0 text-decoration-none")
+            ),
+            dbc.Collapse(
+                dbc.CardBody(dcc.Loading(html.Div(id='cohort-section'))),
+                id='cohort-collapse', is_open=False
+            ),
+        ], className='mb-4'),
         
         # Individual MID margins section with column selector
         dbc.Card([
@@ -128,7 +283,7 @@ app.layout = html.Div([
                             placeholder='Select Month',
                             className='mb-2'
                         ),
-                    ], width=6),
+                    ], width=4),
                     dbc.Col([
                         dcc.Dropdown(
                             id='filter-dropdown',
@@ -139,13 +294,26 @@ app.layout = html.Div([
                                 {'label': 'High Margins (>5%)', 'value': 'high'},
                                 {'label': 'Low Margins (<1%)', 'value': 'low'},
                                 {'label': 'Improving MIDs (↑)', 'value': 'improving'},
-                                {'label': 'Declining MIDs (↓)', 'value': 'declining'}
+                                {'label': 'Declining MIDs (↓)', 'value': 'declining'},
+                                {'label': f'Top {TOP_VOLUME_ROWS} by Volume', 'value': 'top'},
+                                {'label': 'Margin Above Threshold', 'value': 'above'},
+                                {'label': 'Margin Below Threshold', 'value': 'below'}
                             ],
                             placeholder='Select Filter',
                             value='all',
                             className='mb-2'
                         ),
-                    ], width=6),
+                    ], width=4),
+                    dbc.Col([
+                        dbc.Input(
+                            id='margin-threshold',
+                            type='number',
+                            step=0.1,
+                            placeholder='Margin % threshold',
+                            debounce=True,
+                            className='mb-2'
+                        ),
+                    ], width=4),
                 ]),
                 
                 # Column Selector
@@ -176,43 +344,1658 @@ app.layout = html.Div([
                 # Table container
                 html.Div(id='mid-table-container'),
                 
-                # Export button
-                dbc.Button(
-                    [html.I(className="fas fa-download me-2"), "Export to CSV"],
-                    id='export-button',
-                    color="success",
-                    className='mt-3'
-                ),
-                dcc.Download(id='download-csv')
+                # Export button, linking to the /export route for the current view
+                dbc.Row([
+                    dbc.Col(
+                        dbc.Button(
+                            [html.I(className="fas fa-download me-2"), "Export"],
+                            id='export-button',
+                            color="success",
+                            external_link=True,
+                            disabled=True
+                        ),
+                        width="auto"
+                    ),
+                    dbc.Col(
+                        dbc.Select(
+                            id='export-format',
+                            options=[
+                                {'label': 'CSV', 'value': 'csv'},
+                                {'label': 'Parquet', 'value': 'parquet'},
+                                {'label': 'Excel (.xlsx)', 'value': 'xlsx'}
+                            ],
+                            value='csv'
+                        ),
+                        width=2
+                    ),
+                ], className='mt-3 g-2 align-items-center')
             ])
         ]),
     ], fluid=True)
 ], style={'background-color': '#f5f5f5', 'min-height': '100vh'})
 
-# Helper functions
-def extract_month_year(filename):
-    match = re.search(r'- (\w+ \d{4})\.xls', filename)
-    return parse(match.group(1)) if match else None
+# Helper functions
+def extract_month_year(filename):
+    """Return the report month named in ``filename`` as a monthly pd.Period, or None."""
+    match = re.search(r'- (\w+ \d{4})\.xls', filename)
+    return pd.Period(parse(match.group(1)), freq='M') if match else None
+
+# Month labels ('January 2024') are the keys used throughout the UI; their
+# canonical form is a monthly Period, and ordering uses its integer ordinal.
+MONTH_LABEL_FORMAT = '%B %Y'
+
+def month_label(period):
+    return period.strftime(MONTH_LABEL_FORMAT)
+
+@functools.lru_cache(maxsize=4096)
+def month_period(label):
+    """Parse a month label produced by month_label back into a Period."""
+    return pd.Period(datetime.strptime(label, MONTH_LABEL_FORMAT), freq='M')
+
+def month_ordinal(label):
+    return month_period(label).ordinal
+
+def excel_format(raw):
+    """Detect the workbook format from its leading bytes: 'xls', 'xlsx' or None."""
+    if raw.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        return 'xls'
+    if raw.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    return None
+
+def excel_engine(fmt):
+    """Pick the pandas engine for a workbook format.
+
+    EXCEL_ENGINE forces a specific engine; otherwise calamine is used when it is
+    installed, falling back to xlrd (.xls) or openpyxl (.xlsx). Unknown formats
+    return None so pandas can try its own detection.
+    """
+    if os.environ.get('EXCEL_ENGINE'):
+        return os.environ['EXCEL_ENGINE']
+    if fmt is None:
+        return None
+    if CALAMINE_AVAILABLE:
+        return 'calamine'
+    return 'xlrd' if fmt == 'xls' else 'openpyxl'
+
+def read_ppi_sheet(source, engine=None):
+    """Read the PPI sheet from workbook bytes or a file path, keeping only the columns clean_data needs."""
+    if isinstance(source, (bytes, bytearray)):
+        header, source = bytes(source[:8]), io.BytesIO(source)
+    else:
+        with open(source, 'rb') as f:
+            header = f.read(8)
+    if engine is None:
+        engine = excel_engine(excel_format(header))
+    # Skip the last row (likely a total row) when reading Excel
+    return pd.read_excel(source, sheet_name='PPI', skipfooter=1, engine=engine,
+                         usecols=lambda name: name in ppi_columns)
+
+def parse_currency_columns(df, columns):
+    """Convert '$1,234.56'-style columns to float in a single pass over the frame."""
+    text_columns = [col for col in columns if df[col].dtype == object]
+    if text_columns:
+        # Strip currency symbols from every text cell at once (column-major order),
+        # using Arrow string kernels rather than a Python call per cell
+        cells = pd.Series(df[text_columns].to_numpy().ravel(order='F')).astype('string[pyarrow]')
+        cells = cells.str.replace('$', '', regex=False).str.replace(',', '', regex=False)
+        parsed = cells.astype(float).to_numpy().reshape(len(text_columns), len(df))
+        for col, values in zip(text_columns, parsed):
+            df[col] = values
+    for col in columns:
+        if col not in text_columns:
+            df[col] = df[col].astype(float)
+    return df
+
+def clean_data(df):
+    """Clean the dataframe by converting columns to numeric and filtering out total rows."""
+    # Remove rows where 'MID' is NaN, or where it contains 'total' (case-insensitive)
+    mids = df['MID']
+    present = mids.notna().to_numpy()
+    mid_text = mids[present].astype(str)
+    keep = ~mid_text.str.contains('total', case=False).to_numpy()
+    df = df.take(present.nonzero()[0][keep])
+    # Convert 'MID' to string for string operations
+    df['MID'] = mid_text.to_numpy()[keep]
+    # Remove duplicates based on 'MID'
+    df = df.drop_duplicates(subset=['MID'], keep='first')
+    df = parse_currency_columns(df, [col for col in volume_columns + ['Agent Net'] if col in df.columns])
+    total_volume = df[volume_columns].sum(axis=1)
+    df['Total Volume'] = total_volume
+    # Margin is undefined (NaN) for MIDs without processing volume
+    df['Gross Margin %'] = (df['Agent Net'] / total_volume * 100).where(total_volume > 0)
+    return df
+
+def compact_money(values):
+    """Pick the smallest lossless storage for a float64 dollar column.
+
+    Integer cents (int32) when every value is a whole number of cents and there
+    are no NaNs, float32 when rounding it back to cents restores every value
+    exactly, otherwise the original float64 values.
+    """
+    with np.errstate(invalid='ignore'):
+        cents = np.round(values * 100)
+        if (not np.isnan(values).any() and np.abs(cents).max(initial=0) < 2**31
+                and np.array_equal(cents / 100, values)):
+            return cents.astype(np.int32)
+        single = values.astype(np.float32)
+        if np.array_equal(np.round(single.astype(np.float64), 2), values, equal_nan=True):
+            return single
+    return values
+
+def compact_month(df):
+    """Return a memory-compact copy of a cleaned month frame.
+
+    MIDs that are canonical integers are stored as int64 (categorical
+    otherwise), DBA Name is dictionary-encoded, and dollar columns go through
+    compact_money. month_column and expand_month restore the exact values.
+    """
+    df = df.copy()
+    mids = df['MID'].astype(str)
+    if mids.str.fullmatch(r'[1-9][0-9]{0,17}').all():
+        df['MID'] = mids.astype(np.int64)
+    else:
+        df['MID'] = mids.astype('category')
+    if 'DBA Name' in df.columns:
+        df['DBA Name'] = df['DBA Name'].astype('category')
+    for col in money_columns:
+        if col in df.columns:
+            df[col] = compact_money(df[col].to_numpy(dtype=np.float64))
+    return df
+
+def month_column(df, col):
+    """Return one column of a (possibly compact) month frame with its original values."""
+    series = df[col]
+    if col == 'MID':
+        return series.astype(str)
+    if col == 'DBA Name' and isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(object)
+    if col in money_columns:
+        if pd.api.types.is_integer_dtype(series.dtype):
+            return series / 100
+        if series.dtype == np.float32:
+            return series.astype(np.float64).round(2)
+    return series
+
+def expand_month(df):
+    """Undo compact_month for a whole month frame."""
+    return pd.DataFrame({col: month_column(df, col) for col in df.columns}, index=df.index)
+
+def content_hash(raw):
+    """Return the content hash used to key an uploaded month under the current CACHE_VERSION."""
+    return hashlib.blake2b(raw, digest_size=16, person=f'ppi-v{CACHE_VERSION}'.encode()).hexdigest()
+
+def write_frame(path_base, df, compression='zstd'):
+    """Atomically write a month frame as Feather, or as a pickle if Arrow cannot encode it.
+
+    Returns the path written: ``path_base`` plus '.feather' or '.pkl'.
+    """
+    os.makedirs(os.path.dirname(path_base), exist_ok=True)
+    tmp_path = f'{path_base}.{uuid.uuid4().hex}.tmp'
+    try:
+        df.reset_index(drop=True).to_feather(tmp_path, compression=compression)
+        path = path_base + '.feather'
+    except (pa.ArrowException, ValueError):
+        df.to_pickle(tmp_path)
+        path = path_base + '.pkl'
+    os.replace(tmp_path, path)
+    return path
+
+def read_frame(path, memory_map=False):
+    """Read a frame written by write_frame."""
+    if path.endswith('.pkl'):
+        return pd.read_pickle(path)
+    table = pyarrow.feather.read_table(path, memory_map=memory_map)
+    return table.to_pandas(split_blocks=memory_map)
+
+class ParseCache:
+    """Content-addressed on-disk cache of cleaned month frames.
+
+    Entries are Feather (Arrow IPC) files named by the hash of the uploaded
+    bytes, so a repeat upload of the same statement skips Excel parsing. Total
+    size is bounded by ``max_bytes``; the least recently used files (by mtime,
+    refreshed on every hit) are deleted first. Frames that Arrow cannot encode,
+    such as object columns with mixed types, are pickled instead.
+    """
+
+    EXTENSIONS = ('.feather', '.pkl')
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _find(self, key):
+        for ext in self.EXTENSIONS:
+            path = os.path.join(self.directory, key + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def contains(self, key):
+        return self._find(key) is not None
+
+    def get(self, key):
+        """Return the cached frame for ``key``, or None on a miss."""
+        path = self._find(key)
+        if path is None:
+            return None
+        try:
+            df = read_frame(path)
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process between the lookup and the read
+            return None
+        return df
+
+    def put(self, key, df):
+        """Write ``df`` to the cache and evict old entries beyond the size cap."""
+        write_frame(os.path.join(self.directory, key), df)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.EXTENSIONS):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        # Always keep the most recently used entry
+        for _, size, path in sorted(entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def record(self, hit):
+        """Count an upload as a cache hit or miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        entries = [entry.stat().st_size for entry in os.scandir(self.directory)
+                   if entry.name.endswith(self.EXTENSIONS)] if os.path.isdir(self.directory) else []
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+            'entries': len(entries),
+            'bytes': sum(entries),
+            'max_bytes': self.max_bytes,
+        }
+
+class MonthWarehouse:
+    """Persistent store of each session's months, partitioned by month.
+
+    Each month is one uncompressed Feather (Arrow IPC) file at
+    ``month=YYYY-MM/<content hash>.feather``, shared by every session that
+    uploaded the same statement. A session's months are listed in its own
+    ``indexes/<session>.json``, mapping month labels to their partition file
+    and content hash, so sessions never see or clear each other's months.
+    Files are read through memory maps, so several worker processes share
+    the same pages read-only. Writers serialize on a lock file.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _locked(self):
+        os.makedirs(self.directory, exist_ok=True)
+        lock = open(os.path.join(self.directory, 'index.lock'), 'w')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _index_path(self, session):
+        # Session ids are uuid4 hex strings, like the session files
+        if not re.fullmatch(r'[0-9a-f]{32}', session or ''):
+            raise ValueError(f'invalid session id: {session!r}')
+        return os.path.join(self.directory, 'indexes', f'{session}.json')
+
+    def index(self, session):
+        """Return ``{month: {'digest', 'file', 'rows'}}`` for every month stored by a session."""
+        try:
+            with open(self._index_path(session)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_index(self, session, index):
+        path = self._index_path(session)
+        if not index:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+
+    def _referenced(self):
+        """Partition files listed by any session's index."""
+        files = set()
+        index_dir = os.path.join(self.directory, 'indexes')
+        if os.path.isdir(index_dir):
+            for entry in os.scandir(index_dir):
+                if entry.name.endswith('.json'):
+                    with open(entry.path) as f:
+                        files.update(month['file'] for month in json.load(f).values())
+        return files
+
+    def months(self, session):
+        """Return ``{month: content hash}`` for every month stored by a session."""
+        return {month: entry['digest'] for month, entry in self.index(session).items()}
+
+    def put(self, session, month, digest, df):
+        """Store ``df`` as the session's month, replacing the session's previous version."""
+        partition = 'month=' + month_period(month).strftime('%Y-%m')
+        with self._locked():
+            index = self.index(session)
+            previous = index.get(month)
+            if previous and previous['digest'] == digest:
+                return
+            path = self._find(digest, partition)
+            if path is None:
+                path = write_frame(os.path.join(self.directory, partition, digest), df,
+                                   compression='uncompressed')
+            index[month] = {'digest': digest, 'file': os.path.relpath(path, self.directory), 'rows': len(df)}
+            self._write_index(session, index)
+            if previous:
+                self._remove_unreferenced([previous['file']])
+
+    def clear(self, session):
+        """Remove every month of a session, keeping files other sessions still use."""
+        with self._locked():
+            files = [entry['file'] for entry in self.index(session).values()]
+            self._write_index(session, {})
+            self._remove_unreferenced(files)
+
+    def _remove_unreferenced(self, files):
+        referenced = self._referenced()
+        for relative_path in files:
+            if relative_path not in referenced:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directory, relative_path))
+
+    def _find(self, key, partition=None):
+        """Path of the file holding content hash ``key``, searching every partition by default."""
+        if partition is not None:
+            partitions = [os.path.join(self.directory, partition)]
+        elif os.path.isdir(self.directory):
+            partitions = [entry.path for entry in os.scandir(self.directory) if entry.name.startswith('month=')]
+        else:
+            partitions = []
+        for directory in partitions:
+            for ext in ParseCache.EXTENSIONS:
+                path = os.path.join(directory, key + ext)
+                if os.path.exists(path):
+                    return path
+        return None
+
+    def get(self, key):
+        """Return the frame whose content hash is ``key``, or None."""
+        path = self._find(key)
+        if path is None:
+            return None
+        try:
+            return read_frame(path, memory_map=True)
+        except FileNotFoundError:
+            return None
+
+class DatasetStore:
+    """Server-side registry of cleaned month frames keyed by content hash.
+
+    Frames live in an in-process LRU bounded by ``max_bytes``. An entry evicted
+    from memory is reloaded on its next lookup from the first of ``sources``
+    that still holds it: the month warehouse, whose memory-mapped files
+    worker processes share, then the compressed on-disk parse cache.
+    The browser only ever holds a handle of the form
+    ``{'session': ..., 'months': {month: content hash}}``.
+    """
+
+    def __init__(self, sources, max_bytes):
+        self.sources = sources
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, df):
+        """Keep a cleaned month frame in memory under its content hash."""
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return
+            self._frames[key] = df
+            self._sizes[key] = size
+            # Evict least recently used frames, always keeping the newest one
+            while sum(self._sizes.values()) > self.max_bytes and len(self._frames) > 1:
+                evicted, _ = self._frames.popitem(last=False)
+                del self._sizes[evicted]
+
+    def get(self, key):
+        """Return the frame for ``key``, or None if it is no longer stored."""
+        with self._lock:
+            df = self._frames.get(key)
+            if df is not None:
+                self._frames.move_to_end(key)
+                return df
+        for source in self.sources:
+            df = source.get(key)
+            if df is not None:
+                self.put(key, df)
+                return df
+        return None
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+def artifact_bytes(value):
+    """Approximate memory held by a cached artifact: frames, arrays, and tuples or objects of them."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(artifact_bytes(item) for item in value)
+    if hasattr(value, '__dict__'):
+        return sum(artifact_bytes(item) for item in vars(value).values())
+    return 0
+
+class LRUCache:
+    """Small thread-safe LRU mapping for artifacts derived from month frames.
+
+    Bounded by entry count and, with ``max_bytes``, by the artifact_bytes of
+    its entries; the newest entry is always kept.
+    """
+
+    def __init__(self, maxsize, max_bytes=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        size = artifact_bytes(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self._bytes += size - self._sizes.get(key, 0)
+            self._items[key] = value
+            self._sizes[key] = size
+            self._items.move_to_end(key)
+            while len(self._items) > 1 and (len(self._items) > self.maxsize or
+                                            (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                evicted, _ = self._items.popitem(last=False)
+                self._bytes -= self._sizes.pop(evicted)
+
+    def memory_bytes(self):
+        with self._lock:
+            return self._bytes
+
+    def get_or_build(self, key, build):
+        """Return the cached value for ``key``, calling ``build()`` on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+@contextlib.contextmanager
+def single_flight(name):
+    """Hold an exclusive lock named ``name`` shared by every server and ingest process.
+
+    Work done under the lock (parsing an upload, building a figure) happens
+    once; other processes wait and then find the result in the cache.
+    """
+    lock_dir = os.path.join(DATA_DIR, 'locks')
+    os.makedirs(lock_dir, exist_ok=True)
+    path = os.path.join(lock_dir, f'{name}.lock')
+    while True:
+        lock = open(path, 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # The holder before us may have removed the file; retry on the current one
+        try:
+            if os.stat(path).st_ino == os.fstat(lock.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        lock.close()
+    try:
+        yield
+    finally:
+        # Lock files are removed once released, so one per digest or key never piles up
+        os.remove(path)
+        lock.close()
+
+class SharedCache:
+    """JSON values on disk, shared by all WSGI worker processes.
+
+    Holds small values under ``directory/<namespace>/<key>.json``. Writes are
+    atomic, so readers never see a partial file. Past ``max_bytes`` the least
+    recently used files (by mtime, refreshed on every hit) are deleted,
+    checked at most every ``evict_interval`` seconds, so only values that can
+    be rebuilt (summary rows, serialized figures) belong in a bounded cache.
+    With ``max_bytes=None`` nothing is evicted; ingest job state lives in
+    such a store and is deleted by its owners.
+    """
+
+    def __init__(self, directory, max_bytes, evict_interval=60):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evict_interval = evict_interval
+        self._evicted = 0.0
+
+    def _path(self, namespace, key):
+        return os.path.join(self.directory, namespace, f'{key}.json')
+
+    def get(self, namespace, key):
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'rb') as f:
+                value = orjson.loads(f.read())
+            os.utime(path)
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return None
+        return value
+
+    def put(self, namespace, key, value):
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(value))
+        os.replace(tmp_path, path)
+        if self.max_bytes is not None and time.monotonic() - self._evicted > self.evict_interval:
+            self._evicted = time.monotonic()
+            self.evict()
+
+    def evict(self):
+        entries = []
+        for namespace in os.scandir(self.directory):
+            if namespace.is_dir():
+                for entry in os.scandir(namespace.path):
+                    if entry.name.endswith('.json'):
+                        with contextlib.suppress(FileNotFoundError):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    def delete(self, namespace, key):
+        try:
+            os.remove(self._path(namespace, key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, max_age):
+        """Delete values not written or read for more than ``max_age`` seconds."""
+        if not os.path.isdir(self.directory):
+            return
+        cutoff = time.time() - max_age
+        for namespace in os.scandir(self.directory):
+            if namespace.is_dir():
+                for entry in os.scandir(namespace.path):
+                    with contextlib.suppress(FileNotFoundError):
+                        if entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+
+    def get_or_build(self, namespace, key, build):
+        """Return the shared value for ``key``, letting only one process run ``build()``.
+
+        A None result from ``build()`` is returned but not stored.
+        """
+        value = self.get(namespace, key)
+        if value is None:
+            with single_flight(f'{namespace}-{key}'):
+                value = self.get(namespace, key)
+                if value is None:
+                    value = build()
+                    if value is not None:
+                        self.put(namespace, key, value)
+        return value
+
+# Derived artifacts are keyed by the content hashes of the months they read:
+# a month's summary, margins and filter indexes by its own hash, a Change_
+# column by the hashes of its two months. Replacing one month's statement
+# therefore only rebuilds the artifacts that depend on it. artifact_builds
+# counts builds per artifact kind.
+artifact_builds = Counter()
+
+def count_build(kind):
+    artifact_builds[kind] += 1
+
+def versioned(name):
+    """Name of a DATA_DIR cache directory (or shared cache namespace) for the current CACHE_VERSION."""
+    return f'{name}-v{CACHE_VERSION}'
+
+# Cache directories whose contents depend on the cleaning code and schema and
+# can be rebuilt from a new upload
+VERSIONED_CACHE_DIRS = ['parse-cache']
+
+def remove_stale_caches():
+    """Delete cache directories written under an older CACHE_VERSION (or before it existed)."""
+    if not os.path.isdir(DATA_DIR):
+        return
+    current = {versioned(name) for name in VERSIONED_CACHE_DIRS}
+    stale = re.compile('(%s)(-v[0-9]+)?' % '|'.join(map(re.escape, VERSIONED_CACHE_DIRS)))
+    for entry in os.scandir(DATA_DIR):
+        if entry.is_dir() and entry.name not in current and stale.fullmatch(entry.name):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+parse_cache = ParseCache(os.path.join(DATA_DIR, versioned('parse-cache')), PARSE_CACHE_MB * 1024 * 1024)
+shared_cache = SharedCache(os.path.join(DATA_DIR, 'shared'), SHARED_CACHE_MB * 1024 * 1024)
+# Ingest job state and cancel markers cannot be rebuilt, so they are kept apart
+# from shared_cache and never evicted; jobs and the upload callback delete them
+job_store = SharedCache(os.path.join(DATA_DIR, 'ingest'), max_bytes=None)
+warehouse = MonthWarehouse(os.path.join(DATA_DIR, 'warehouse'))
+dataset_store = DatasetStore([warehouse, parse_cache], DATASET_MEMORY_MB * 1024 * 1024)
+
+def new_handle():
+    """Create an empty dataset handle for a browser session.
+
+    ``order`` lists the month labels oldest first and is kept sorted as
+    months are added, so callbacks never need to re-sort them.
+    """
+    return {'session': uuid.uuid4().hex, 'months': {}, 'order': []}
+
+def copy_handle(handle):
+    """Copy a handle so it can be modified without touching the browser's copy."""
+    return {'session': handle['session'], 'months': dict(handle['months']), 'order': handle_months(handle)}
+
+def add_month(handle, month, digest):
+    """Point ``month`` at ``digest`` in the handle, keeping ``order`` sorted."""
+    if month not in handle['months']:
+        ordinals = [month_ordinal(m) for m in handle['order']]
+        handle['order'].insert(bisect.bisect(ordinals, month_ordinal(month)), month)
+    handle['months'][month] = digest
+
+def remove_month(handle, month):
+    """Drop ``month`` from the handle."""
+    del handle['months'][month]
+    handle['order'].remove(month)
+
+def handle_months(handle):
+    """Return the month labels referenced by a handle, oldest first."""
+    if not handle or not handle.get('months'):
+        return []
+    order = handle.get('order')
+    if order is not None and len(order) == len(handle['months']):
+        return list(order)
+    # Handles saved before the month order was tracked
+    return sorted(handle['months'], key=month_ordinal)
+
+def load_months(handle):
+    """Resolve a handle to an ordered mapping of month label -> DataFrame.
+
+    Months whose frames can no longer be found in the store are skipped.
+    """
+    frames = OrderedDict()
+    for month in handle_months(handle):
+        df = dataset_store.get(handle['months'][month])
+        if df is not None:
+            frames[month] = df
+    return frames
+
+# MID x month margin matrices, keyed by the (month, content hash) pairs they cover
+# Superseded matrices (one per merge while a batch uploads) age out by size
+margin_matrix_cache = LRUCache(32, max_bytes=ARTIFACT_MEMORY_MB * 1024 * 1024 // 4)
+
+def frames_key(handle, frames):
+    """Key derived artifacts by the exact month contents they were built from."""
+    return tuple((month, handle['months'][month]) for month in frames)
+
+# Per-month margin Series and per-month-pair change Series the matrix is assembled from
+month_margin_cache = LRUCache(4096, max_bytes=ARTIFACT_MEMORY_MB * 1024 * 1024 // 8)
+change_column_cache = LRUCache(4096, max_bytes=ARTIFACT_MEMORY_MB * 1024 * 1024 // 8)
+
+def month_margins(digest, df):
+    """Gross Margin % of one month indexed by MID."""
+    def build():
+        count_build('month_margins')
+        return pd.Series(df['Gross Margin %'].to_numpy(), index=month_column(df, 'MID'))
+    return month_margin_cache.get_or_build(digest, build)
+
+def change_column(previous_digest, previous_df, digest, df):
+    """Margin change from one month to the next, indexed by the union of their MIDs."""
+    def build():
+        count_build('change_column')
+        return month_margins(digest, df) - month_margins(previous_digest, previous_df)
+    return change_column_cache.get_or_build((previous_digest, digest), build)
+
+def build_margin_matrix(frames, digests):
+    """Build the MID x month margin matrix for an ordered mapping of month frames.
+
+    Columns are '{month} Margin %' for every month followed by the
+    'Change_{prev}_{curr}' month-over-month differences. ``digests`` lists
+    the months' content hashes, which key the cached pieces.
+    """
+    months = list(frames)
+    margins = pd.concat(
+        [month_margins(digest, df) for digest, df in zip(digests, frames.values())],
+        axis=1, keys=[f'{month} Margin %' for month in months]
+    )
+    if len(months) < 2:
+        return margins
+    changes = pd.concat(
+        [change_column(digests[i - 1], frames[months[i - 1]], digests[i], frames[months[i]])
+         for i in range(1, len(months))],
+        axis=1, keys=[f'Change_{prev}_{curr}' for prev, curr in zip(months, months[1:])]
+    ).reindex(margins.index)
+    return pd.concat([margins, changes], axis=1)
+
+def margin_matrix(handle, frames=None):
+    """Return the cached margin matrix for a handle, building it if needed."""
+    if frames is None:
+        frames = load_months(handle)
+    digests = [handle['months'][month] for month in frames]
+    return margin_matrix_cache.get_or_build(frames_key(handle, frames), lambda: build_margin_matrix(frames, digests))
+
+# Selected month joined with its margin history, and the row order of each
+# filtered/sorted view of it
+mid_view_cache = LRUCache(8, max_bytes=ARTIFACT_MEMORY_MB * 1024 * 1024 // 4)
+mid_order_cache = LRUCache(128)
+
+def mid_view(handle, frames, month):
+    """Return the month's rows joined with every month's margin and change columns."""
+    def build():
+        df = expand_month(frames[month]).reset_index(drop=True)
+        history = margin_matrix(handle, frames).reindex(df['MID']).reset_index(drop=True)
+        return pd.concat([df, history], axis=1)
+    return mid_view_cache.get_or_build((frames_key(handle, frames), month), build)
+
+# Filter-dropdown presets that depend only on the month's own margin
+MARGIN_PRESETS = {
+    'positive': ('>', 0),
+    'negative': ('<', 0),
+    'high': ('>', 5),
+    'low': ('<', 1),
+}
+
+class MarginIndex:
+    """A month's Gross Margin % sorted once, for preset and threshold filters.
+
+    ``order`` holds row positions by ascending margin, with rows that have no
+    margin left out, and ``values`` holds the margins in that order. Any
+    above/below threshold is then a binary search plus a slice. The preset
+    filters are evaluated up front.
+    """
+
+    def __init__(self, margin):
+        margin = np.asarray(margin, dtype=float)
+        valid = np.flatnonzero(~np.isnan(margin))
+        self.order = valid[np.argsort(margin[valid], kind='stable')]
+        self.values = margin[self.order]
+        self.presets = {name: self.positions(op, threshold) for name, (op, threshold) in MARGIN_PRESETS.items()}
+
+    def positions(self, op, threshold):
+        """Sorted row positions whose margin is above ('>') or below ('<') ``threshold``."""
+        if op == '>':
+            rows = self.order[np.searchsorted(self.values, threshold, side='right'):]
+        else:
+            rows = self.order[:np.searchsorted(self.values, threshold, side='left')]
+        return np.sort(rows)
+
+# Margin indexes keyed by content hash and built at ingest; user thresholds
+# and month-over-month change filters are cached as they are requested
+margin_index_cache = LRUCache(4096)
+threshold_filter_cache = LRUCache(256)
+change_filter_cache = LRUCache(1024)
+
+def margin_index(digest, df=None):
+    """Return the cached MarginIndex for a month, or None if its data is gone."""
+    index = margin_index_cache.get(digest)
+    if index is None:
+        if df is None:
+            df = dataset_store.get(digest)
+            if df is None:
+                return None
+        count_build('margin_index')
+        index = MarginIndex(month_column(df, 'Gross Margin %'))
+        margin_index_cache.put(digest, index)
+    return index
+
+# Row positions of each month by Total Volume descending, keyed by content hash and built at ingest
+volume_order_cache = LRUCache(4096)
+
+def volume_order(digest, df=None):
+    """Return the cached descending-volume permutation of a month, or None if its data is gone."""
+    order = volume_order_cache.get(digest)
+    if order is None:
+        if df is None:
+            df = dataset_store.get(digest)
+            if df is None:
+                return None
+        count_build('volume_order')
+        # Negating keeps ties in row order, matching a stable descending sort
+        order = np.argsort(-month_column(df, 'Total Volume').to_numpy(), kind='stable')
+        volume_order_cache.put(digest, order)
+    return order
+
+def top_by_volume(digest, df, n):
+    """Row positions of the ``n`` highest-volume rows, highest first; O(n) given the ingest permutation."""
+    return volume_order(digest, df)[:n]
+
+def filter_positions(handle, frames, month, filter_type, threshold=None):
+    """Sorted row positions of a month kept by a filter-dropdown choice, or None for all rows."""
+    digest = handle['months'][month]
+    if filter_type in MARGIN_PRESETS:
+        return margin_index(digest, frames[month]).presets[filter_type]
+    if filter_type == 'top':
+        return np.sort(top_by_volume(digest, frames[month], TOP_VOLUME_ROWS))
+    if filter_type in ('above', 'below') and threshold is not None:
+        op = '>' if filter_type == 'above' else '<'
+        return threshold_filter_cache.get_or_build(
+            (digest, op, float(threshold)),
+            lambda: margin_index(digest, frames[month]).positions(op, float(threshold))
+        )
+    if filter_type in ('improving', 'declining'):
+        months = list(frames)
+        position = months.index(month)
+        if position == 0:
+            return None
+        previous = months[position - 1]
+
+        previous_digest = handle['months'][previous]
+
+        def build():
+            count_build('change_filter')
+            change = change_column(previous_digest, frames[previous], digest, frames[month])
+            change = change.reindex(month_column(frames[month], 'MID')).to_numpy()
+            return np.flatnonzero(change > 0 if filter_type == 'improving' else change < 0)
+        return change_filter_cache.get_or_build((previous_digest, digest, filter_type), build)
+    return None
+
+# One '{column} operator value' clause of a DataTable filter_query
+FILTER_CLAUSE = re.compile(
+    r'^\s*\{(?P<column>[^}]+)\}\s*'
+    r'(?P<operator>[is]?(?:>=|<=|!=|=|<|>)|[is]?(?:contains|datestartswith)|ge|le|lt|gt|ne|eq)'
+    r'\s*(?P<value>.*?)\s*$'
+)
+FILTER_OPERATORS = {'ge': '>=', 'le': '<=', 'lt': '<', 'gt': '>', 'ne': '!=', 'eq': '='}
+FILTER_UNARY_CLAUSE = re.compile(r'^\s*\{(?P<column>[^}]+)\}\s*is\s+(?P<operator>blank|nil|num|str|even|odd)\s*$')
+
+def unary_filter_mask(column, operator):
+    """Mask for a DataTable '{column} is <operator>' clause."""
+    numeric = pd.api.types.is_numeric_dtype(column)
+    if operator == 'nil':
+        return column.isna()
+    if operator == 'blank':
+        blank = column.isna()
+        return blank if numeric else blank | (column.astype(str).str.strip() == '')
+    if operator in ('num', 'str'):
+        return column.notna() & (numeric == (operator == 'num'))
+    if not numeric:
+        return pd.Series(False, index=column.index)
+    return column.abs() % 2 == (0 if operator == 'even' else 1)
+
+def filter_query_mask(df, filter_query):
+    """Translate a DataTable filter_query into a vectorized boolean mask.
+
+    Supports the clauses the table's filter row emits (comparisons, contains
+    and datestartswith, with optional i/s case prefixes, and the 'is blank',
+    'is nil', 'is num', 'is str', 'is even' and 'is odd' tests) joined by
+    '&&'. A clause that cannot be parsed, or names an unknown column, matches
+    no rows, so an unsupported filter never shows rows it should have hidden.
+    """
+    mask = pd.Series(True, index=df.index)
+    for clause in filter(str.strip, (filter_query or '').split(' && ')):
+        unary = FILTER_UNARY_CLAUSE.match(clause)
+        match = unary or FILTER_CLAUSE.match(clause)
+        if not match or match['column'] not in df.columns:
+            mask &= False
+            continue
+        if unary:
+            mask &= unary_filter_mask(df[match['column']], match['operator'])
+            continue
+        column = df[match['column']]
+        operator = FILTER_OPERATORS.get(match['operator'], match['operator'])
+        case = not operator.startswith('i')
+        if operator[0] in 'is' and operator[1:] in ('contains', 'datestartswith', '=', '!=', '<', '>', '<=', '>='):
+            operator = operator[1:]
+        value = match['value']
+        if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1].replace('\\' + value[0], value[0])
+        if operator in ('contains', 'datestartswith'):
+            text = column.astype(str)
+            if operator == 'contains':
+                mask &= text.str.contains(value, case=case, regex=False) & column.notna()
+            else:
+                mask &= text.str.startswith(value) & column.notna()
+            continue
+        if pd.api.types.is_numeric_dtype(column):
+            try:
+                value = float(value)
+            except ValueError:
+                mask &= False
+                continue
+        elif not case:
+            column, value = column.astype(str).str.lower(), value.lower()
+        comparisons = {
+            '=': column.__eq__, '!=': column.__ne__, '<': column.__lt__,
+            '>': column.__gt__, '<=': column.__le__, '>=': column.__ge__,
+        }
+        mask &= comparisons[operator](value)
+    return mask
+
+def mid_view_order(handle, frames, month, filter_type, filter_query='', sort_by=None, threshold=None):
+    """Return row positions of the filtered, sorted view of a month.
+
+    Cached per (month contents, preset filter, filter query, sort) so paging
+    through a view only slices this array. Without an explicit sort, rows keep
+    the month's ingest-time Total Volume descending order, gathered through
+    the filter rather than re-sorted.
+    """
+    sort_key = tuple((col['column_id'], col['direction']) for col in sort_by or [])
+    key = (frames_key(handle, frames), month, filter_type, threshold, filter_query or '', sort_key)
+
+    def build():
+        df = mid_view(handle, frames, month)
+        digest = handle['months'][month]
+        columns = [col for col, _ in sort_key if col in df.columns]
+        if filter_type == 'top' and not filter_query and not columns:
+            return top_by_volume(digest, frames[month], TOP_VOLUME_ROWS)
+        keep = None
+        positions = filter_positions(handle, frames, month, filter_type, threshold)
+        if positions is not None:
+            keep = np.zeros(len(df), dtype=bool)
+            keep[positions] = True
+        if filter_query:
+            query_mask = filter_query_mask(df, filter_query).to_numpy()
+            keep = query_mask if keep is None else keep & query_mask
+        if columns:
+            if keep is not None:
+                df = df[keep]
+            ascending = [direction == 'asc' for col, direction in sort_key if col in df.columns]
+            df = df.sort_values(columns, ascending=ascending, kind='stable', na_position='last')
+            return df.index.to_numpy()
+        order = volume_order(digest, frames[month])
+        return order if keep is None else order[keep[order]]
+    return mid_order_cache.get_or_build(key, build)
+
+# Every numeric MID table column is displayed with two decimals
+DISPLAY_PRECISION = 2
+
+def table_records(df, columns):
+    """Build DataTable rows with only ``columns``, rounding floats to display precision.
+
+    Columns are converted whole to Python lists and zipped into records,
+    so no full-width to_dict or per-cell Python work is needed.
+    """
+    columns = [col for col in columns if col in df.columns]
+    arrays = []
+    for col in columns:
+        values = df[col]
+        if pd.api.types.is_float_dtype(values.dtype):
+            values = values.round(DISPLAY_PRECISION)
+            arrays.append(values.astype(object).where(values.notna(), None).tolist())
+        else:
+            arrays.append(values.tolist())
+    return [dict(zip(columns, row)) for row in zip(*arrays)]
+
+def is_coloured_column(col):
+    """Whether a MID table column is coloured by value: month margins and changes."""
+    return col.startswith('Change_') or (col.endswith(' Margin %') and col != 'Gross Margin %')
+
+def cell_classes(col, values):
+    """Colour class of each cell of a margin or change column ('' for uncoloured cells).
+
+    The wide MID table renders these as spans styled by assets/mid_table.css,
+    matching the style_data_conditional rules of the regular table.
+    """
+    values = np.asarray(values, dtype=float)
+    with np.errstate(invalid='ignore'):
+        if col.startswith('Change_'):
+            return np.select([values > 0, values < 0], ['c-up', 'c-down'], '')
+        return np.select([values > 5, values > 0, values < 0],
+                         ['m-high', 'm-pos', 'm-neg'], '')
+
+def wide_table_records(df, columns):
+    """Build rows for the wide MID table.
+
+    Margin and change cells are sent as pre-formatted markdown spans carrying
+    their colour class, so the table needs no per-column conditional styles.
+    """
+    records = table_records(df, columns)
+    for col in columns:
+        if col not in df.columns or not is_coloured_column(col):
+            continue
+        suffix = 'pp' if col.startswith('Change_') else '%'
+        text = df[col].map(f'{{:.{DISPLAY_PRECISION}f}}{suffix}'.format, na_action='ignore')
+        for record, value, cls in zip(records, text.tolist(), cell_classes(col, df[col]).tolist()):
+            if not isinstance(value, str):
+                record[col] = None
+            elif cls:
+                record[col] = f'<span class="{cls}">{value}</span>'
+            else:
+                record[col] = value
+    return records
+
+# Per-month KPI aggregates keyed by content hash, computed once per ingested month
+month_summary_cache = LRUCache(4096)
+
+def summarize_month(df):
+    """Compute the monthly summary metrics for one cleaned month frame."""
+    total_volume = month_column(df, 'Total Volume')
+    agent_net = month_column(df, 'Agent Net')
+    return {
+        'TOTAL MIDS': len(df),
+        'PROCESSING MIDS': int((total_volume > 0).sum()),
+        'POSITIVE NET MIDS': int((agent_net > 0).sum()),
+        'TOTAL PROFIT': float(agent_net.sum()),
+        'MID VOLUME': float(total_volume.sum())
+    }
+
+def month_summary(digest, df=None):
+    """Return the cached summary row for a month, or None if its data is gone."""
+    row = month_summary_cache.get(digest)
+    if row is None:
+        def build():
+            frame = dataset_store.get(digest) if df is None else df
+            if frame is None:
+                return None
+            count_build('summary')
+            return summarize_month(frame)
+        row = shared_cache.get_or_build(versioned('summaries'), digest, build)
+        if row is None:
+            return None
+        month_summary_cache.put(digest, row)
+    return row
+
+def summary_frame(handle):
+    """Assemble the monthly summary table, with month-over-month changes, from cached rows."""
+    summary = []
+    for month in handle_months(handle):
+        row = month_summary(handle['months'][month])
+        if row is not None:
+            summary.append({'MONTH': month, **row})
+    summary_df = pd.DataFrame(summary)
+    if summary_df.empty:
+        return summary_df
+    
+    # Calculate changes
+    for col in ['TOTAL MIDS', 'PROCESSING MIDS', 'POSITIVE NET MIDS']:
+        summary_df[f'{col} CHANGE'] = summary_df[col].diff().fillna(0)
+    for col in ['TOTAL PROFIT', 'MID VOLUME']:
+        summary_df[f'{col} CHANGE'] = summary_df[col].diff().fillna(0)
+    return summary_df
+
+# Active MIDs of each month keyed by content hash, and the presence matrices
+# and cohort tables built from them, keyed by the months they cover
+month_activity_cache = LRUCache(4096, max_bytes=ARTIFACT_MEMORY_MB * 1024 * 1024 // 8)
+presence_cache = LRUCache(8, max_bytes=ARTIFACT_MEMORY_MB * 1024 * 1024 // 8)
+cohort_cache = LRUCache(32)
+
+def month_activity(digest, df):
+    """MIDs that processed volume in a month, with their Total Volume.
+
+    MIDs are returned in their compact form (int64 where possible) so the
+    presence matrix can be keyed without building strings.
+    """
+    def build():
+        count_build('month_activity')
+        volume = month_column(df, 'Total Volume').to_numpy(dtype=float)
+        active = volume > 0
+        return df['MID'].to_numpy()[active], volume[active]
+    return month_activity_cache.get_or_build(digest, build)
+
+class MidPresence:
+    """Month x MID presence bitmap and Total Volume matrix for a run of months.
+
+    ``active[i, j]`` is set when MID ``j`` processed volume in month ``i``
+    and ``volume[i, j]`` holds that volume. Months are rows, so each month
+    is one contiguous slice.
+    """
+
+    def __init__(self, activity):
+        keys = [mids for mids, _ in activity]
+        if len({mids.dtype.kind for mids in keys}) > 1:
+            # Integer MIDs are canonical decimal strings, so mixed months match as text
+            keys = [mids.astype(str) for mids in keys]
+        codes, self.mids = pd.factorize(np.concatenate(keys))
+        self.active = np.zeros((len(activity), len(self.mids)), dtype=bool)
+        self.volume = np.zeros((len(activity), len(self.mids)))
+        start = 0
+        for i, (mids, volume) in enumerate(activity):
+            month_codes = codes[start:start + len(mids)]
+            start += len(mids)
+            self.active[i, month_codes] = True
+            np.add.at(self.volume[i], month_codes, volume)
+
+def mid_presence(handle, frames):
+    """Return the cached presence matrix over every loaded month of a handle."""
+    def build():
+        count_build('presence')
+        return MidPresence([month_activity(handle['months'][month], df) for month, df in frames.items()])
+    return presence_cache.get_or_build(frames_key(handle, frames), build)
+
+def cohort_counts(active, volume):
+    """Cohort flows between each pair of consecutive months, in one vectorized pass.
+
+    For every month after the first, an active MID is retained if it was
+    active the month before, reactivated if it was active in some earlier
+    month but not the month before, and new otherwise. MIDs active the month
+    before but not this month have churned. Volume retained is this month's
+    volume of the retained MIDs.
+    """
+    previous, current = active[:-1], active[1:]
+    seen = np.logical_or.accumulate(active, axis=0)[:-1]
+    retained = previous & current
+    returning = current & ~previous
+    reactivated = returning & seen
+    volume_retained = np.einsum('ij,ij->i', volume[1:], retained)
+    previous_volume = volume[:-1].sum(axis=1)
+    previous_count = previous.sum(axis=1)
+    retained_count = retained.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'ACTIVE MIDS': current.sum(axis=1),
+            'NEW MIDS': returning.sum(axis=1) - reactivated.sum(axis=1),
+            'REACTIVATED MIDS': reactivated.sum(axis=1),
+            'RETAINED MIDS': retained_count,
+            'CHURNED MIDS': (previous & ~current).sum(axis=1),
+            'MID RETENTION %': np.where(previous_count > 0, retained_count / previous_count * 100, np.nan),
+            'VOLUME RETAINED': volume_retained,
+            'VOLUME RETENTION %': np.where(previous_volume > 0, volume_retained / previous_volume * 100, np.nan),
+        }
+
+def cohort_frame(handle, frames=None):
+    """Month-over-month cohort table for a handle: one row per month after the first."""
+    if frames is None:
+        frames = load_months(handle)
+    def build():
+        count_build('cohorts')
+        months = list(frames)
+        if len(months) < 2:
+            return pd.DataFrame()
+        presence = mid_presence(handle, frames)
+        cohorts = pd.DataFrame(cohort_counts(presence.active, presence.volume))
+        cohorts.insert(0, 'MONTH', months[1:])
+        return cohorts
+    return cohort_cache.get_or_build(frames_key(handle, frames), build)
+
+# Serialized dashboard figures keyed by a hash of the summary table they plot
+figure_cache = LRUCache(64)
+
+def summary_key(summary_df):
+    """Content hash of a summary table, covering column names and values."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update('\x1f'.join(summary_df.columns).encode())
+    digest.update(pd.util.hash_pandas_object(summary_df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def build_dashboard_figures(summary_df):
+    """Build the dashboard charts and return each one as Plotly JSON."""
+    count_build('figures')
+    # 1. Combined Profit and Volume Chart
+    fig_combined = go.Figure()
+    fig_combined.add_trace(go.Bar(
+        x=summary_df['MONTH'],
+        y=summary_df['TOTAL PROFIT'],
+        name='Total Profit',
+        marker_color=np.where(summary_df['TOTAL PROFIT'] > 0, '#28a745', '#dc3545'),
+        yaxis='y'
+    ))
+    fig_combined.add_trace(go.Scatter(
+        x=summary_df['MONTH'],
+        y=summary_df['MID VOLUME'],
+        name='MID Volume',
+        line=dict(color='#17a2b8', width=3),
+        yaxis='y2'
+    ))
+    fig_combined.update_layout(
+        title='Profit vs Volume Trend',
+        xaxis_title='Month',
+        yaxis=dict(title='Total Profit ($)', side='left'),
+        yaxis2=dict(title='MID Volume ($)', side='right', overlaying='y'),
+        hovermode='x unified',
+        template='plotly_white',
+        height=400
+    )
+    
+    # 2. MIDs Performance Chart
+    fig_mids = go.Figure()
+    fig_mids.add_trace(go.Scatter(
+        x=summary_df['MONTH'],
+        y=summary_df['TOTAL MIDS'],
+        name='Total MIDs',
+        line=dict(color='#6c757d', width=2)
+    ))
+    fig_mids.add_trace(go.Scatter(
+        x=summary_df['MONTH'],
+        y=summary_df['PROCESSING MIDS'],
+        name='Processing MIDs',
+        line=dict(color='#28a745', width=2)
+    ))
+    fig_mids.add_trace(go.Scatter(
+        x=summary_df['MONTH'],
+        y=summary_df['POSITIVE NET MIDS'],
+        name='Positive Net MIDs',
+        line=dict(color='#ffc107', width=2)
+    ))
+    fig_mids.update_layout(
+        title='MIDs Performance Overview',
+        xaxis_title='Month',
+        yaxis_title='Number of MIDs',
+        hovermode='x unified',
+        template='plotly_white',
+        height=400
+    )
+    
+    # 3. Profit Margin Gauge for latest month
+    if len(summary_df) > 0:
+        latest = summary_df.iloc[-1]
+        latest_margin = (latest['TOTAL PROFIT'] / latest['MID VOLUME'] * 100) if latest['MID VOLUME'] > 0 else 0
+        fig_gauge = go.Figure(go.Indicator(
+            mode="gauge+number+delta",
+            value=latest_margin,
+            domain={'x': [0, 1], 'y': [0, 1]},
+            title={'text': f"Overall Profit Margin % ({latest['MONTH']})"},
+            delta={'reference': summary_df.iloc[-2]['TOTAL PROFIT'] / summary_df.iloc[-2]['MID VOLUME'] * 100 
+                   if len(summary_df) > 1 and summary_df.iloc[-2]['MID VOLUME'] > 0 else 0},
+            gauge={
+                'axis': {'range': [None, 10]},
+                'bar': {'color': "#28a745" if latest_margin > 0 else "#dc3545"},
+                'steps': [
+                    {'range': [0, 1], 'color': "#f8d7da"},
+                    {'range': [1, 3], 'color': "#fff3cd"},
+                    {'range': [3, 5], 'color': "#d1ecf1"},
+                    {'range': [5, 10], 'color': "#d4edda"}
+                ],
+                'threshold': {
+                    'line': {'color': "red", 'width': 4},
+                    'thickness': 0.75,
+                    'value': 0
+                }
+            }
+        ))
+    else:
+        fig_gauge = go.Figure()
+    fig_gauge.update_layout(height=300)
+    
+    return {
+        'combined': fig_combined.to_json(),
+        'mids': fig_mids.to_json(),
+        'gauge': fig_gauge.to_json()
+    }
+
+def dashboard_figures(summary_df):
+    """Return the dashboard figures as dicts, building them only for an unseen summary table."""
+    key = summary_key(summary_df)
+    serialized = figure_cache.get_or_build(
+        key, lambda: shared_cache.get_or_build(versioned('figures'), key, lambda: build_dashboard_figures(summary_df))
+    )
+    return {name: orjson.loads(fig_json) for name, fig_json in serialized.items()}
+
+def export_columns(df):
+    """Columns included when exporting a MID view."""
+    columns = ['MID', 'DBA Name', 'Total Volume', 'Agent Net'] + \
+              [col for col in df.columns if 'Margin %' in col or col.startswith('Change_')] + \
+              volume_columns
+    return [col for col in columns if col in df.columns]
+
+def session_path(session_id):
+    # Session ids are uuid4 hex strings; anything else cannot name a session file
+    if not re.fullmatch(r'[0-9a-f]{32}', session_id or ''):
+        return None
+    return os.path.join(DATA_DIR, 'sessions', f'{session_id}.json')
+
+_sessions_pruned = 0.0
+
+def save_session(handle):
+    """Persist a handle so server routes can resolve it from its session id."""
+    global _sessions_pruned
+    path = session_path(handle['session'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(handle, f)
+    os.replace(tmp_path, path)
+    if time.monotonic() - _sessions_pruned > 3600:
+        _sessions_pruned = time.monotonic()
+        prune_sessions(SESSION_MAX_AGE_DAYS * 86400)
+        # State of jobs whose browser went away before merging them
+        job_store.prune(INGEST_JOB_MAX_AGE)
+        remove_stale_caches()
+
+def delete_session(session_id):
+    """Forget a session: its saved handle and its months in the warehouse."""
+    path = session_path(session_id)
+    if path is None:
+        return
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+    warehouse.clear(session_id)
+
+def prune_sessions(max_age):
+    """Delete sessions whose handle was last saved more than ``max_age`` seconds ago."""
+    session_dir = os.path.join(DATA_DIR, 'sessions')
+    if not os.path.isdir(session_dir):
+        return
+    cutoff = time.time() - max_age
+    for entry in os.scandir(session_dir):
+        with contextlib.suppress(FileNotFoundError):
+            if entry.stat().st_mtime < cutoff:
+                if entry.name.endswith('.json'):
+                    delete_session(entry.name[:-len('.json')])
+                else:
+                    # Temporary file left by an interrupted save
+                    os.remove(entry.path)
+
+def load_session(session_id):
+    """Return the last saved handle for a session, or None."""
+    path = session_path(session_id)
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def ingest_workbook(source, digest, progress=None):
+    """Parse and clean a workbook (bytes or path) into the parse cache.
+
+    Returns the cleaned frame, or None when the parse cache already holds it.
+    ``progress``, if given, is called with 'parsed' and then 'cleaned'.
+    Concurrent ingests of the same file wait for the first one to finish
+    rather than parsing it again.
+    """
+    if parse_cache.contains(digest):
+        return None
+    with single_flight(f'parse-{digest}'):
+        if parse_cache.contains(digest):
+            return None
+        raw = read_ppi_sheet(source)
+        if progress:
+            progress('parsed')
+        df = compact_month(clean_data(raw).reset_index(drop=True))
+        if progress:
+            progress('cleaned')
+        parse_cache.put(digest, df)
+    return df
+
+def store_ingested(digest, df):
+    """Make an ingest result available to callbacks and count it as a cache hit or miss."""
+    parse_cache.record(hit=df is None)
+    if df is not None:
+        dataset_store.put(digest, df)
+        month_summary(digest, df)
+        margin_index(digest, df)
+        volume_order(digest, df)
+
+def persist_months(handle):
+    """Write the handle's months to its session's warehouse index so they survive a restart."""
+    stored = warehouse.months(handle['session'])
+    for month, digest in handle['months'].items():
+        if stored.get(month) != digest:
+            df = dataset_store.get(digest)
+            if df is not None:
+                warehouse.put(handle['session'], month, digest, df)
+
+_ingest_pool = None
+_ingest_pool_lock = threading.Lock()
+
+def get_ingest_pool():
+    """Return the shared ingest process pool, creating it on first use."""
+    global _ingest_pool
+    with _ingest_pool_lock:
+        if _ingest_pool is None:
+            # Spawn rather than fork: the Flask server is multi-threaded
+            _ingest_pool = ProcessPoolExecutor(
+                max_workers=INGEST_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _ingest_pool
+
+def reset_ingest_pool():
+    """Discard the ingest pool after a worker process died."""
+    global _ingest_pool
+    with _ingest_pool_lock:
+        if _ingest_pool is not None:
+            _ingest_pool.shutdown(wait=False, cancel_futures=True)
+        _ingest_pool = None
+
+_ingest_manager = None
+
+def get_ingest_manager():
+    """Return the multiprocessing manager that carries progress out of pool workers."""
+    global _ingest_manager
+    with _ingest_pool_lock:
+        if _ingest_manager is None:
+            _ingest_manager = multiprocessing.get_context('spawn').Manager()
+        return _ingest_manager
+
+# Stages a file passes through, in order; 'failed' and 'cancelled' end it early
+INGEST_STAGES = ['queued', 'decoded', 'parsed', 'cleaned', 'stored']
+
+class IngestCancelled(Exception):
+    """Raised inside an ingest whose job has been cancelled."""
+
+class StageReporter:
+    """Progress callback for one file of an ingest job; picklable for pool workers."""
+
+    def __init__(self, updates, cancelled, index):
+        self.updates = updates
+        self.cancelled = cancelled
+        self.index = index
+
+    def __call__(self, stage):
+        if self.cancelled.is_set():
+            raise IngestCancelled()
+        self.updates.put((self.index, stage))
+
+class JobCancelFlag:
+    """Cancellation flag for an ingest job, visible to every server process."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def set(self):
+        job_store.put('cancel', self.job_id, True)
+
+    def is_set(self):
+        return job_store.get('cancel', self.job_id) is not None
+
+class IngestJob:
+    """A batch of uploads ingested on a background thread.
+
+    Each file moves through INGEST_STAGES. The job publishes its state to the
+    job store after every change, and with a heartbeat timestamp while it
+    runs, so whichever server process the browser's poll reaches can report
+    progress, merge months as soon as their file is stored, and tell a job
+    still working from one whose process died.
+    """
+
+    def __init__(self, uploads):
+        self.id = uuid.uuid4().hex
+        self.uploads = uploads
+        self.files = [{'filename': filename, 'month': month, 'stage': 'queued',
+                       'digest': None, 'rows': None, 'error': None}
+                      for _, filename, month in uploads]
+        self.done = False
+        self.cancelled = JobCancelFlag(self.id)
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self):
+        # A discarded job keeps running until it notices the cancel flag, but
+        # must not bring back the state file discard_ingest_job removed
+        if job_store.get('discarded', self.id) is None:
+            job_store.put('jobs', self.id, {'files': self.files, 'done': self.done, 'heartbeat': time.time()})
+
+    def _beat(self, stopped):
+        while not stopped.wait(INGEST_HEARTBEAT_SECONDS):
+            with self._lock:
+                self._publish()
+
+    def _set(self, index, stage, **fields):
+        with self._lock:
+            current = self.files[index]['stage']
+            if current not in INGEST_STAGES:
+                return
+            if stage in INGEST_STAGES and INGEST_STAGES.index(stage) < INGEST_STAGES.index(current):
+                # Progress from a pool worker can arrive after the file's result
+                return
+            self.files[index].update(stage=stage, **fields)
+            self._publish()
+
+    def put(self, update):
+        """Apply a ``(index, stage)`` update; lets an inline ingest report directly."""
+        self._set(*update)
+
+    def _drain(self, updates):
+        while True:
+            try:
+                index, stage = updates.get_nowait()
+            except queue.Empty:
+                return
+            self._set(index, stage)
+
+    def _finish(self, index, digest, run):
+        """Record the outcome of ``run()``, which returns the ingested frame."""
+        try:
+            df = run()
+        except IngestCancelled:
+            self._set(index, 'cancelled')
+            return
+        except BrokenProcessPool as exc:
+            reset_ingest_pool()
+            self._set(index, 'failed', error=str(exc))
+            return
+        except Exception as exc:
+            self._set(index, 'failed', error=str(exc))
+            return
+        store_ingested(digest, df)
+        self._set(index, 'stored', rows=None if df is None else len(df))
+
+    def run(self):
+        use_pool = len(self.uploads) > 1 and INGEST_WORKERS > 1
+        if use_pool:
+            manager = get_ingest_manager()
+            updates, cancelled = manager.Queue(), manager.Event()
+        else:
+            updates, cancelled = self, self.cancelled
+        pending = {}
+        stopped = threading.Event()
+        threading.Thread(target=self._beat, args=(stopped,), name=f'ingest-{self.id}-heartbeat', daemon=True).start()
+        try:
+            for index, (content, _, _) in enumerate(self.uploads):
+                if self.cancelled.is_set():
+                    break
+                try:
+                    decoded = base64.b64decode(content.split(',')[1])
+                except Exception as exc:
+                    self._set(index, 'failed', error=str(exc))
+                    continue
+                digest = content_hash(decoded)
+                self._set(index, 'decoded', digest=digest)
+                reporter = StageReporter(updates, cancelled, index)
+                if use_pool:
+                    future = get_ingest_pool().submit(ingest_workbook, decoded, digest, reporter)
+                    pending[future] = (index, digest)
+                else:
+                    self._finish(index, digest, lambda: ingest_workbook(decoded, digest, reporter))
+            while pending:
+                done, _ = wait(pending, timeout=INGEST_POLL_MS / 1000, return_when=FIRST_COMPLETED)
+                self._drain(updates)
+                if self.cancelled.is_set():
+                    # Queued files never start; running ones stop at their next stage
+                    cancelled.set()
+                    for future in pending:
+                        future.cancel()
+                for future in done:
+                    index, digest = pending.pop(future)
+                    if future.cancelled():
+                        self._set(index, 'cancelled')
+                    else:
+                        self._finish(index, digest, future.result)
+        finally:
+            stopped.set()
+            with self._lock:
+                for f in self.files:
+                    if f['stage'] in INGEST_STAGES[:-1]:
+                        f['stage'] = 'cancelled'
+                self.done = True
+                self._publish()
+            job_store.delete('cancel', self.id)
+            if job_store.get('discarded', self.id) is not None:
+                # Drop any state published while the discard was under way
+                job_store.delete('jobs', self.id)
+                job_store.delete('discarded', self.id)
+
+def start_ingest_job(uploads):
+    """Start ingesting ``[(content, filename, month), ...]`` on a background thread."""
+    job = IngestJob(uploads)
+    threading.Thread(target=job.run, name=f'ingest-{job.id}', daemon=True).start()
+    return job
 
-def clean_data(df):
-    """Clean the dataframe by converting columns to numeric and filtering out total rows."""
-    for col in volume_columns + ['Agent Net']:
-        if col in df.columns:
-            df[col] = df[col].replace(r'[\$,]', '', regex=True).astype(float)
-    df['Total Volume'] = df[volume_columns].sum(axis=1)
-    df['Gross Margin %'] = df.apply(
-        lambda row: (row['Agent Net'] / row['Total Volume']) * 100 if row['Total Volume'] > 0 else float('nan'),
-        axis=1
-    )
-    # Remove rows where 'MID' is NaN
-    df = df[df['MID'].notna()]
-    # Convert 'MID' to string for string operations
-    df['MID'] = df['MID'].astype(str)
-    # Filter out rows where 'MID' contains 'total' (case-insensitive)
-    df = df[~df['MID'].str.contains('total', case=False)]
-    # Remove duplicates based on 'MID'
-    df = df.drop_duplicates(subset=['MID'], keep='first')
-    return df
+def ingest_job_state(job_id):
+    """Return ``(files, done)`` for a job started by any server process, or None.
+
+    A running job whose heartbeat stopped is reported as done, with the files
+    it had not finished marked failed.
+    """
+    state = job_store.get('jobs', job_id) if job_id else None
+    if state is None:
+        return None
+    files, done = state['files'], state['done']
+    if not done and time.time() - state.get('heartbeat', 0) > INGEST_HEARTBEAT_TIMEOUT:
+        for f in files:
+            if f['stage'] in INGEST_STAGES[:-1]:
+                f.update(stage='failed', error='the server process ingesting it stopped')
+        done = True
+    return files, done
+
+def cancel_ingest_job(job_id):
+    if job_id:
+        JobCancelFlag(job_id).set()
+
+def discard_ingest_job(job_id, cancel=False):
+    """Forget a job once its results are merged, optionally cancelling it first."""
+    if not job_id:
+        return
+    if cancel:
+        state = ingest_job_state(job_id)
+        if state is not None and not state[1]:
+            # The job's thread is still running; it deletes these markers when it ends
+            job_store.put('discarded', job_id, True)
+            cancel_ingest_job(job_id)
+    job_store.delete('jobs', job_id)
+
+def render_ingest_progress(files):
+    """Progress bar plus one status line per file of a running ingest job."""
+    steps = len(INGEST_STAGES) - 1
+    completed = sum(INGEST_STAGES.index(f['stage']) if f['stage'] in INGEST_STAGES else steps
+                    for f in files)
+    percent = 100 * completed / (steps * len(files)) if files else 100
+    return html.Div([
+        dbc.Progress(value=percent, label=f'{percent:.0f}%', striped=True, animated=True, className='mb-2'),
+        html.Ul([html.Li(f"{f['filename']}: {f['stage']}") for f in files], className='small mb-2'),
+    ])
 
 def create_kpi_card(title, value, change=None, icon="fas fa-chart-line", format_currency=False):
     """Create a KPI card with optional change indicator"""
@@ -253,17 +2036,274 @@ def create_kpi_card(title, value, change=None, icon="fas fa-chart-line", format_
     
     return dbc.Card(card_content, style=CARD_STYLE)
 
+# Callback instrumentation
+class Histogram:
+    """Prometheus-style histogram with fixed bucket upper bounds."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class CallbackMetrics:
+    """Per-callback histograms of wall time, payload sizes and rows processed."""
+
+    METRICS = {
+        'duration_seconds': ('Wall time spent in the callback function.',
+                             (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)),
+        'request_bytes': ('Size of the serialized callback request (inputs and state).',
+                          (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)),
+        'response_bytes': ('Size of the serialized callback response (outputs).',
+                           (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)),
+        'rows': ('Rows processed by the callback.',
+                 (10, 100, 1e3, 1e4, 1e5, 1e6)),
+        'client_render_seconds': ('Browser time from the parsed callback response to the next painted frame.',
+                                  (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)),
+        'time_to_first_kpi_seconds': ('Browser time from sending an upload to the first painted KPI cards.',
+                                      (0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)),
+    }
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, callback, metric, value):
+        with self._lock:
+            key = (metric, callback)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(self.METRICS[metric][1])
+            self._histograms[key].observe(value)
+
+    def state(self):
+        """Return ``{metric: {callback: {'counts', 'sum', 'count'}}}`` for this process."""
+        state = {}
+        with self._lock:
+            for (metric, callback), hist in self._histograms.items():
+                state.setdefault(metric, {})[callback] = {'counts': list(hist.counts), 'sum': hist.sum,
+                                                          'count': hist.count}
+        return state
+
+    def render(self, state=None):
+        """Render histograms in the Prometheus text exposition format.
+
+        ``state`` is this process's state() by default, or one summed over
+        every worker by MetricFiles.collect.
+        """
+        state = self.state() if state is None else state
+        lines = []
+        for metric, (help_text, buckets) in self.METRICS.items():
+            name = f'dash_callback_{metric}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for callback, hist in sorted(state.get(metric, {}).items()):
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], hist['counts']):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else f'{bound:g}'
+                    lines.append(f'{name}_bucket{{callback="{callback}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{callback="{callback}"}} {hist["sum"]:g}')
+                lines.append(f'{name}_count{{callback="{callback}"}} {hist["count"]}')
+        return '\n'.join(lines) + '\n'
+
+class SlowestProfiles:
+    """Keep cProfile dumps for the ``limit`` slowest instrumented callback calls."""
+
+    def __init__(self, directory, limit):
+        self.directory = directory
+        self.limit = limit
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def offer(self, callback, elapsed, profiler):
+        with self._lock:
+            if len(self._heap) >= self.limit and elapsed <= self._heap[0][0]:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'{callback}-{time.time():.0f}-{elapsed:.3f}s.prof')
+            profiler.dump_stats(path)
+            heapq.heappush(self._heap, (elapsed, path))
+            if len(self._heap) > self.limit:
+                _, fastest = heapq.heappop(self._heap)
+                os.remove(fastest)
+
+def merge_metrics(total, part):
+    """Add one process's metric snapshot into ``total`` (see process_metrics)."""
+    for metric, callbacks in part.get('histograms', {}).items():
+        for callback, hist in callbacks.items():
+            into = total['histograms'].setdefault(metric, {}).setdefault(
+                callback, {'counts': [0] * len(hist['counts']), 'sum': 0.0, 'count': 0})
+            into['counts'] = [a + b for a, b in zip(into['counts'], hist['counts'])]
+            into['sum'] += hist['sum']
+            into['count'] += hist['count']
+    for kind in ('counters', 'gauges'):
+        for name, values in part.get(kind, {}).items():
+            into = total[kind].setdefault(name, {})
+            for label, value in values.items():
+                into[label] = into.get(label, 0) + value
+    return total
+
+def empty_metrics():
+    return {'histograms': {}, 'counters': {}, 'gauges': {}}
+
+class MetricFiles:
+    """Per-process metric snapshots under ``directory``, summed across WSGI workers.
+
+    Each process writes its process_metrics() to ``<host>-<pid>.json`` after
+    requests, at most every ``interval`` seconds with a trailing write for
+    requests that fell inside the interval, so a /metrics scrape sees
+    the whole server whichever worker answers it. Snapshots of exited
+    processes on this host are folded into ``archive.json``, so counters and
+    histograms never go backwards; their gauges are dropped.
+    """
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self._flushed = 0.0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def _path(self, pid=None):
+        return os.path.join(self.directory, f'{socket.gethostname()}-{pid or os.getpid()}.json')
+
+    def flush(self, force=False):
+        with self._lock:
+            wait = self.interval - (time.monotonic() - self._flushed)
+            if not force and wait > 0:
+                if self._pending is None:
+                    self._pending = threading.Timer(wait, self.flush, kwargs={'force': True})
+                    self._pending.daemon = True
+                    self._pending.start()
+                return
+            self._flushed = time.monotonic()
+            self._pending = None
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path()
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(process_metrics()))
+        os.replace(tmp_path, path)
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return None
+
+    def collect(self):
+        """Return the metrics of every live worker plus the archive of exited ones."""
+        self.flush(force=True)
+        prefix = socket.gethostname() + '-'
+        with open(os.path.join(self.directory, 'metrics.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive_path = os.path.join(self.directory, 'archive.json')
+            archive = self._read(archive_path) or empty_metrics()
+            total = merge_metrics(empty_metrics(), {'histograms': archive['histograms'],
+                                                    'counters': archive['counters']})
+            archived = False
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.json') or entry.name == 'archive.json':
+                    continue
+                snapshot = self._read(entry.path)
+                if snapshot is None:
+                    continue
+                pid = entry.name[len(prefix):-len('.json')] if entry.name.startswith(prefix) else ''
+                if pid.isdigit() and not process_alive(int(pid)):
+                    merge_metrics(archive, {'histograms': snapshot['histograms'],
+                                            'counters': snapshot['counters']})
+                    os.remove(entry.path)
+                    archived = True
+                merge_metrics(total, snapshot)
+            if archived:
+                tmp_path = f'{archive_path}.{uuid.uuid4().hex}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(orjson.dumps(archive))
+                os.replace(tmp_path, archive_path)
+        return total
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+callback_metrics = CallbackMetrics()
+slowest_profiles = SlowestProfiles(os.path.join(DATA_DIR, 'profiles'), PROFILE_SLOWEST)
+metric_files = MetricFiles(os.path.join(DATA_DIR, 'metrics'))
+atexit.register(metric_files.flush, force=True)
+_callback_rows = contextvars.ContextVar('callback_rows', default=None)
+
+def record_rows(count):
+    """Add to the rows-processed metric of the callback currently running."""
+    rows = _callback_rows.get()
+    if rows is not None:
+        rows[0] += int(count)
+
+def instrumented_callback(*args, **kwargs):
+    """Drop-in replacement for ``@app.callback`` that records callback metrics.
+
+    Wall time and rows processed are measured here; request and response sizes
+    are taken from the HTTP exchange in record_callback_payload. With
+    PROFILE_SLOWEST set, every call runs under cProfile and the slowest calls
+    are dumped to DATA_DIR/profiles.
+    """
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*func_args, **func_kwargs):
+            if flask.has_request_context():
+                flask.g.callback_name = name
+            rows = [0]
+            token = _callback_rows.set(rows)
+            profiler = cProfile.Profile() if PROFILE_SLOWEST else None
+            start = time.perf_counter()
+            try:
+                if profiler is not None:
+                    return profiler.runcall(func, *func_args, **func_kwargs)
+                return func(*func_args, **func_kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                _callback_rows.reset(token)
+                callback_metrics.observe(name, 'duration_seconds', elapsed)
+                callback_metrics.observe(name, 'rows', rows[0])
+                if profiler is not None:
+                    slowest_profiles.offer(name, elapsed, profiler)
+
+        app.callback(*args, **kwargs)(wrapper)
+        return func
+    return decorator
+
+@app.server.after_request
+def record_callback_payload(response):
+    name = flask.g.get('callback_name')
+    if name:
+        callback_metrics.observe(name, 'request_bytes', flask.request.content_length or 0)
+        callback_metrics.observe(name, 'response_bytes', response.calculate_content_length() or 0)
+    metric_files.flush()
+    return response
+
 # Callback to update available columns based on uploaded data
-@app.callback(
+@instrumented_callback(
     Output('available-columns-store', 'data'),
     Input('stored-data', 'data')
 )
 def update_available_columns(data):
-    if not data:
+    if not handle_months(data):
         return base_mid_columns
     
     # Get all months sorted
-    sorted_months = sorted(data.keys(), key=lambda x: parse(x))
+    sorted_months = handle_months(data)
     
     # Create dynamic columns for each month's margin
     all_columns = base_mid_columns.copy()
@@ -296,7 +2336,7 @@ def update_available_columns(data):
     return all_columns
 
 # Callback to update column selector
-@app.callback(
+@instrumented_callback(
     [Output('column-selector', 'options'),
      Output('column-selector', 'value'),
      Output('volume-columns-selector', 'options'),
@@ -309,11 +2349,11 @@ def update_available_columns(data):
     [Input('available-columns-store', 'data'), Input('stored-data', 'data')]
 )
 def update_column_selector(available_columns, data):
-    if not available_columns or not data:
+    if not available_columns or not handle_months(data):
         return [], [], [], [], [], [], [], [], html.Div("No data available")
     
     # Get current month's columns as default
-    sorted_months = sorted(data.keys(), key=lambda x: parse(x)) if data else []
+    sorted_months = handle_months(data)
     current_month = sorted_months[-1] if sorted_months else None
     
     # Default selections include base columns plus current month margin
@@ -423,7 +2463,7 @@ app.clientside_callback(
 )
 
 # Update button callbacks to work with all selectors
-@app.callback(
+@instrumented_callback(
     [Output('column-selector-display', 'value'),
      Output('volume-columns-selector-display', 'value'),
      Output('margin-columns-selector-display', 'value'),
@@ -459,78 +2499,165 @@ def update_all_column_selections(select_all, clear_all, reset_default, basic_opt
     
     return dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
-# Main data upload callback
-@app.callback(
-    [Output('stored-data', 'data'), Output('file-list', 'children'), Output('month-dropdown', 'options')],
-    [Input('upload-data', 'contents'), Input('clear-button', 'n_clicks')],
-    [State('upload-data', 'filename'), State('stored-data', 'data')]
+# Starting an ingest job is its own callback: dash-renderer drops the response
+# of a callback still running when it is triggered again, and the poll
+# interval below triggers update_data every INGEST_POLL_MS
+@instrumented_callback(
+    [Output('ingest-jobs', 'data'), Output('ingest-poll', 'disabled', allow_duplicate=True),
+     Output('ingest-status', 'is_open', allow_duplicate=True),
+     Output('ingest-progress', 'children', allow_duplicate=True)],
+    Input('upload-data', 'contents'),
+    [State('upload-data', 'filename'), State('ingest-jobs', 'data'), State('ingest-acks', 'data')],
+    prevent_initial_call=True
+)
+def start_upload(contents, filenames, started, acks):
+    if not contents:
+        return (dash.no_update,) * 4
+    uploads = []
+    for content, filename in zip(contents, filenames):
+        month_year = extract_month_year(filename)
+        if month_year:
+            uploads.append((content, filename, month_label(month_year)))
+    # Parsing runs in the background; the poll interval merges months as they
+    # land. Jobs still running for earlier drops keep going alongside this one.
+    job = start_ingest_job(uploads)
+    started = (started or []) + [job.id]
+    acks = acks or {}
+    files = [f for job_id in started if job_id not in acks
+             for state in [ingest_job_state(job_id)] if state is not None for f in state[0]]
+    return started, False, True, render_ingest_progress(files)
+
+# Main data callback: merges ingest jobs and streamed uploads into the handle.
+# Its responses can be dropped by the browser (see start_upload), so nothing
+# is forgotten on the server until a later call shows the browser applied the
+# response that merged it: 'ingest-acks' maps each started job id, and each
+# streamed upload, to 'merged' once merged and 'discarded' once cleaned up.
+@instrumented_callback(
+    [Output('stored-data', 'data'), Output('file-list', 'children'), Output('month-dropdown', 'options'),
+     Output('ingest-acks', 'data'), Output('ingest-poll', 'disabled'),
+     Output('ingest-status', 'is_open'), Output('ingest-progress', 'children')],
+    [Input('clear-button', 'n_clicks'), Input('stream-upload-result', 'data'),
+     Input('ingest-poll', 'n_intervals'), Input('cancel-ingest-button', 'n_clicks')],
+    [State('stored-data', 'data'), State('ingest-jobs', 'data'), State('ingest-acks', 'data')]
 )
-def update_data(contents, clear_clicks, filenames, existing_data):
+def update_data(clear_clicks, stream_result, poll_intervals, cancel_clicks, existing_data, started, acks):
     ctx = dash.callback_context
-    if not ctx.triggered:
-        return {}, [], []
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    data = existing_data or {}
+    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+    started = started or []
+    acks = dict(acks or {})
     if trigger_id == 'clear-button':
-        return {}, dbc.Alert("All files cleared.", color="info"), []
-    if contents:
-        for content, filename in zip(contents, filenames):
-            month_year = extract_month_year(filename)
-            if month_year:
-                content_type, content_string = content.split(',')
-                decoded = base64.b64decode(content_string)
-                # Skip the last row (likely a total row) when reading Excel
-                df = pd.read_excel(io.BytesIO(decoded), sheet_name='PPI', skipfooter=1)
-                df = clean_data(df)
-                data[month_year.strftime('%B %Y')] = df.to_dict('records')
-    
-    if data:
+        for job_id in started:
+            if acks.get(job_id) != 'discarded':
+                discard_ingest_job(job_id, cancel=True)
+                acks[job_id] = 'discarded'
+        if existing_data and existing_data.get('session'):
+            delete_session(existing_data['session'])
+        return ({}, dbc.Alert("All files cleared.", color="info"), [], acks, True, False, None)
+    
+    data = existing_data or new_handle()
+    data = copy_handle(data)
+    if trigger_id is None:
+        # Page load: reopen the months this browser session kept in the warehouse
+        for month, digest in warehouse.months(data['session']).items():
+            if month not in data['months']:
+                add_month(data, month, digest)
+    failures = []
+    changed = trigger_id is None
+    # Merge jobs in the order they started, and each job's files in upload
+    # order, so the last file dropped for a month wins. A finished job is
+    # merged for good only once every older job has finished too, so an older
+    # job's month can never replace the one a newer job merged.
+    running, running_files = [], []
+    for job_id in started:
+        if acks.get(job_id) == 'discarded':
+            continue
+        if acks.get(job_id) == 'merged':
+            # The browser applied the response that merged this job
+            discard_ingest_job(job_id)
+            acks[job_id] = 'discarded'
+            continue
+        state = ingest_job_state(job_id)
+        if state is None:
+            # Pruned, or discarded by a Clear whose response never arrived
+            acks[job_id] = 'discarded'
+            continue
+        files, done = state
+        if trigger_id == 'cancel-ingest-button' and not done:
+            cancel_ingest_job(job_id)
+        for f in files:
+            if f['stage'] == 'stored' and data['months'].get(f['month']) != f['digest']:
+                add_month(data, f['month'], f['digest'])
+                record_rows(f['rows'] or 0)
+                changed = True
+        if done and not running:
+            changed = True
+            acks[job_id] = 'merged'
+            failures += [dbc.Alert(f"Could not read {f['filename']}: {f['error']}", color="danger",
+                                   className="mb-2")
+                         for f in files if f['stage'] == 'failed']
+            cancelled = [f['filename'] for f in files if f['stage'] == 'cancelled']
+            if cancelled:
+                failures.append(dbc.Alert(f"Upload cancelled: {', '.join(cancelled)} not loaded.",
+                                          color="warning", className="mb-2"))
+        else:
+            running.append(job_id)
+            running_files += files
+    if stream_result and acks.get(f"stream-{stream_result['timestamp']}") is None:
+        # Months were already parsed by the /upload endpoint; only merge their handles
+        for upload in stream_result['uploads']:
+            if 'error' in upload:
+                failures.append(dbc.Alert(f"Could not read {upload['filename']}: {upload['error']}",
+                                          color="danger", className="mb-2"))
+            else:
+                add_month(data, upload['month'], upload['digest'])
+        acks[f"stream-{stream_result['timestamp']}"] = 'merged'
+        changed = True
+    # Keep polling while jobs run and until merged jobs are cleaned up
+    polling = bool(running) or 'merged' in (acks.get(job_id) for job_id in started)
+    job_state = (acks, not polling, bool(running), render_ingest_progress(running_files) if running else None)
+    if not changed:
+        return (dash.no_update,) * 3 + job_state
+    
+    frames = load_months(data)
+    missing = [month for month in handle_months(data) if month not in frames]
+    if missing:
+        # Evicted from every store, e.g. a parse cache entry never persisted
+        for month in missing:
+            remove_month(data, month)
+        failures.append(dbc.Alert(f"No longer stored, upload again: {', '.join(missing)}.",
+                                  color="warning", className="mb-2"))
+    if data['months']:
+        # Page loads without any months leave nothing on disk
+        persist_months(data)
+        save_session(data)
+    sorted_months = handle_months(data)
+    if sorted_months:
+        # Build the cross-month margin matrix now so table interactions are lookups
+        margin_matrix(data, frames)
         file_badges = [
             dbc.Badge(f, color="primary", className="me-2")
-            for f in sorted(data.keys(), key=lambda x: parse(x))
+            for f in sorted_months
         ]
-        file_display = html.Div([
+        file_display = html.Div(failures + [
             html.H6("Uploaded Files:", className="mb-2"),
             html.Div(file_badges)
         ])
     else:
-        file_display = dbc.Alert("No files uploaded yet.", color="warning")
+        file_display = html.Div(failures + [dbc.Alert("No files uploaded yet.", color="warning")])
     
-    month_options = [{'label': m, 'value': m} for m in sorted(data.keys(), key=lambda x: parse(x))]
-    return data, file_display, month_options
+    month_options = [{'label': m, 'value': m} for m in sorted_months]
+    return (data, file_display, month_options) + job_state
 
-# Dashboard update callback
-@app.callback(
-    [Output('kpi-cards', 'children'), Output('summary-section', 'children'), Output('charts-section', 'children')],
+# KPI cards come first and only read the cached per-month summary rows
+@instrumented_callback(
+    Output('kpi-cards', 'children'),
     Input('stored-data', 'data')
 )
-def update_dashboard(data):
-    if not data:
-        return [], dbc.Alert('Please upload files to view analytics.', color='info'), []
-    
-    summary = []
-    for month, records in sorted(data.items(), key=lambda x: parse(x[0])):
-        df = pd.DataFrame(records)
-        total_mids = len(df)
-        processing_mids = (df['Total Volume'] > 0).sum()
-        positive_net_mids = (df['Agent Net'] > 0).sum()
-        total_profit = df['Agent Net'].sum()
-        mid_volume = df['Total Volume'].sum()
-        summary.append({
-            'MONTH': month,
-            'TOTAL MIDS': total_mids,
-            'PROCESSING MIDS': processing_mids,
-            'POSITIVE NET MIDS': positive_net_mids,
-            'TOTAL PROFIT': total_profit,
-            'MID VOLUME': mid_volume
-        })
-    summary_df = pd.DataFrame(summary)
-    
-    # Calculate changes
-    for col in ['TOTAL MIDS', 'PROCESSING MIDS', 'POSITIVE NET MIDS']:
-        summary_df[f'{col} CHANGE'] = summary_df[col].diff().fillna(0)
-    for col in ['TOTAL PROFIT', 'MID VOLUME']:
-        summary_df[f'{col} CHANGE'] = summary_df[col].diff().fillna(0)
+def update_kpis(data):
+    summary_df = summary_frame(data)
+    if summary_df.empty:
+        return []
+    record_rows(len(summary_df))
     
     # Get latest month data for KPI cards
     latest = summary_df.iloc[-1]
@@ -565,6 +2692,17 @@ def update_dashboard(data):
             "fas fa-check-circle"
         ), width=3),
     ])
+    return kpi_cards
+
+@instrumented_callback(
+    Output('summary-section', 'children'),
+    Input('stored-data', 'data')
+)
+def update_summary_table(data):
+    summary_df = summary_frame(data)
+    if summary_df.empty:
+        return dbc.Alert('Please upload files to view analytics.', color='info')
+    record_rows(len(summary_df))
     
     # Create enhanced summary table with conditional formatting
     def style_data_conditional():
@@ -652,203 +2790,166 @@ def update_dashboard(data):
         ])
     ])
     
-    # Create enhanced charts
-    # 1. Combined Profit and Volume Chart
-    fig_combined = go.Figure()
-    fig_combined.add_trace(go.Bar(
-        x=summary_df['MONTH'],
-        y=summary_df['TOTAL PROFIT'],
-        name='Total Profit',
-        marker_color=['#28a745' if x > 0 else '#dc3545' for x in summary_df['TOTAL PROFIT']],
-        yaxis='y'
-    ))
-    fig_combined.add_trace(go.Scatter(
-        x=summary_df['MONTH'],
-        y=summary_df['MID VOLUME'],
-        name='MID Volume',
-        line=dict(color='#17a2b8', width=3),
-        yaxis='y2'
-    ))
-    fig_combined.update_layout(
-        title='Profit vs Volume Trend',
-        xaxis_title='Month',
-        yaxis=dict(title='Total Profit ($)', side='left'),
-        yaxis2=dict(title='MID Volume ($)', side='right', overlaying='y'),
-        hovermode='x unified',
-        template='plotly_white',
-        height=400
-    )
-    
-    # 2. MIDs Performance Chart
-    fig_mids = go.Figure()
-    fig_mids.add_trace(go.Scatter(
-        x=summary_df['MONTH'],
-        y=summary_df['TOTAL MIDS'],
-        name='Total MIDs',
-        line=dict(color='#6c757d', width=2)
-    ))
-    fig_mids.add_trace(go.Scatter(
-        x=summary_df['MONTH'],
-        y=summary_df['PROCESSING MIDS'],
-        name='Processing MIDs',
-        line=dict(color='#28a745', width=2)
-    ))
-    fig_mids.add_trace(go.Scatter(
-        x=summary_df['MONTH'],
-        y=summary_df['POSITIVE NET MIDS'],
-        name='Positive Net MIDs',
-        line=dict(color='#ffc107', width=2)
-    ))
-    fig_mids.update_layout(
-        title='MIDs Performance Overview',
-        xaxis_title='Month',
-        yaxis_title='Number of MIDs',
-        hovermode='x unified',
-        template='plotly_white',
-        height=400
+    return summary_table
+
+# Toggle the collapsible dashboard sections
+for section in ('charts', 'cohort'):
+    app.clientside_callback(
+        """
+        function(n_clicks, is_open) {
+            return !is_open;
+        }
+        """,
+        Output(f'{section}-collapse', 'is_open'),
+        Input(f'{section}-toggle', 'n_clicks'),
+        State(f'{section}-collapse', 'is_open'),
+        prevent_initial_call=True
     )
-    
-    # 3. Profit Margin Gauge for latest month
-    if len(summary_df) > 0:
-        latest_margin = (latest['TOTAL PROFIT'] / latest['MID VOLUME'] * 100) if latest['MID VOLUME'] > 0 else 0
-        fig_gauge = go.Figure(go.Indicator(
-            mode="gauge+number+delta",
-            value=latest_margin,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': f"Overall Profit Margin % ({latest['MONTH']})"},
-            delta={'reference': summary_df.iloc[-2]['TOTAL PROFIT'] / summary_df.iloc[-2]['MID VOLUME'] * 100 
-                   if len(summary_df) > 1 and summary_df.iloc[-2]['MID VOLUME'] > 0 else 0},
-            gauge={
-                'axis': {'range': [None, 10]},
-                'bar': {'color': "#28a745" if latest_margin > 0 else "#dc3545"},
-                'steps': [
-                    {'range': [0, 1], 'color': "#f8d7da"},
-                    {'range': [1, 3], 'color': "#fff3cd"},
-                    {'range': [3, 5], 'color': "#d1ecf1"},
-                    {'range': [5, 10], 'color': "#d4edda"}
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 0
-                }
-            }
-        ))
-        fig_gauge.update_layout(height=300)
+
+# Charts are only built while their section is open
+@instrumented_callback(
+    Output('charts-section', 'children'),
+    [Input('stored-data', 'data'), Input('charts-collapse', 'is_open')]
+)
+def update_charts(data, is_open):
+    if not is_open:
+        return dash.no_update
+    summary_df = summary_frame(data)
+    if summary_df.empty:
+        return []
+    record_rows(len(summary_df))
+    figures = dashboard_figures(summary_df)
     
     charts = dbc.Row([
         dbc.Col([
             dbc.Card([
-                dbc.CardBody(dcc.Graph(figure=fig_combined))
+                dbc.CardBody(dcc.Graph(figure=figures['combined']))
             ])
         ], width=12, className="mb-3"),
         dbc.Col([
             dbc.Card([
-                dbc.CardBody(dcc.Graph(figure=fig_mids))
+                dbc.CardBody(dcc.Graph(figure=figures['mids']))
             ])
         ], width=8),
         dbc.Col([
             dbc.Card([
-                dbc.CardBody(dcc.Graph(figure=fig_gauge))
+                dbc.CardBody(dcc.Graph(figure=figures['gauge']))
             ])
         ], width=4),
     ])
     
-    return kpi_cards, summary_table, charts
+    return charts
+
+# MID cohort and retention callback
+@instrumented_callback(
+    Output('cohort-section', 'children'),
+    [Input('stored-data', 'data'), Input('cohort-collapse', 'is_open')]
+)
+def update_cohorts(data, is_open):
+    if not is_open:
+        return dash.no_update
+    frames = load_months(data)
+    if len(frames) < 2:
+        return html.P("Cohorts need at least two months of data.", className="text-muted mb-0")
+    cohorts = cohort_frame(data, frames)
+    record_rows(len(mid_presence(data, frames).mids))
+    
+    fig = go.Figure()
+    for col, name, color in [('RETAINED MIDS', 'Retained', '#17a2b8'),
+                             ('NEW MIDS', 'New', '#28a745'),
+                             ('REACTIVATED MIDS', 'Reactivated', '#ffc107')]:
+        fig.add_trace(go.Bar(x=cohorts['MONTH'], y=cohorts[col], name=name, marker_color=color))
+    fig.add_trace(go.Bar(x=cohorts['MONTH'], y=-cohorts['CHURNED MIDS'], name='Churned',
+                         marker_color='#dc3545'))
+    fig.add_trace(go.Scatter(x=cohorts['MONTH'], y=cohorts['VOLUME RETENTION %'], name='Volume Retention %',
+                             line=dict(color='#6c757d', width=3), yaxis='y2'))
+    fig.update_layout(
+        title='MID Cohorts Month over Month',
+        xaxis_title='Month',
+        yaxis=dict(title='Number of MIDs'),
+        yaxis2=dict(title='Volume Retention (%)', side='right', overlaying='y'),
+        barmode='relative',
+        hovermode='x unified',
+        template='plotly_white',
+        height=400
+    )
+    
+    columns = [
+        {'name': 'Month', 'id': 'MONTH', 'type': 'text'},
+        {'name': 'Active', 'id': 'ACTIVE MIDS', 'type': 'numeric'},
+        {'name': 'New', 'id': 'NEW MIDS', 'type': 'numeric'},
+        {'name': 'Reactivated', 'id': 'REACTIVATED MIDS', 'type': 'numeric'},
+        {'name': 'Retained', 'id': 'RETAINED MIDS', 'type': 'numeric'},
+        {'name': 'Churned', 'id': 'CHURNED MIDS', 'type': 'numeric'},
+        {'name': 'MID Retention', 'id': 'MID RETENTION %', 'type': 'numeric',
+         'format': Format(precision=1, scheme=Scheme.fixed, symbol_suffix='%')},
+        {'name': 'Volume Retained', 'id': 'VOLUME RETAINED', 'type': 'numeric',
+         'format': Format(symbol_prefix="$", precision=2, scheme=Scheme.fixed, group=Group.yes)},
+        {'name': 'Volume Retention', 'id': 'VOLUME RETENTION %', 'type': 'numeric',
+         'format': Format(precision=1, scheme=Scheme.fixed, symbol_suffix='%')},
+    ]
+    
+    return html.Div([
+        html.P("MIDs with processing volume, compared with the month before.",
+               className="text-muted small mb-3"),
+        dcc.Graph(figure=fig),
+        dash_table.DataTable(
+            columns=columns,
+            data=table_records(cohorts, [col['id'] for col in columns]),
+            style_cell={
+                'textAlign': 'center',
+                'padding': '10px',
+                'fontFamily': 'Arial'
+            },
+            style_header={
+                'backgroundColor': '#007bff',
+                'color': 'white',
+                'fontWeight': 'bold'
+            },
+            style_table={'overflowX': 'auto'}
+        )
+    ])
 
 # MID table update callback with column selection
-@app.callback(
-    [Output('mid-table-container', 'children'), Output('filtered-mid-data', 'data')],
+@instrumented_callback(
+    Output('mid-table-container', 'children'),
     [Input('month-dropdown', 'value'), 
      Input('filter-dropdown', 'value'),
+     Input('margin-threshold', 'value'),
      Input('column-selector', 'value'),
      Input('volume-columns-selector', 'value'),
      Input('margin-columns-selector', 'value'),
      Input('change-columns-selector', 'value')],
     State('stored-data', 'data')
 )
-def update_mid_table(selected_month, filter_type, basic_cols, vol_cols, margin_cols, change_cols, data):
-    if not data or not selected_month:
-        return dbc.Alert("Please select a month to view MID details.", color="info"), []
+def update_mid_table(selected_month, filter_type, threshold, basic_cols, vol_cols, margin_cols, change_cols, data):
+    frames = load_months(data)
+    if not frames or selected_month not in frames:
+        return dbc.Alert("Please select a month to view MID details.", color="info")
     
     # Combine all selected columns
     selected_columns = (basic_cols or []) + (vol_cols or []) + (margin_cols or []) + (change_cols or [])
     
     if not selected_columns:
-        return dbc.Alert("Please select at least one column to display.", color="warning"), []
+        return dbc.Alert("Please select at least one column to display.", color="warning")
     
     # Get all months sorted
-    sorted_months = sorted(data.keys(), key=lambda x: parse(x))
-    
-    # Start with the selected month's data
-    df = pd.DataFrame(data[selected_month])
-    
-    # Add margins from all months
-    for month in sorted_months:
-        if month != selected_month:
-            month_df = pd.DataFrame(data[month])
-            df = df.merge(
-                month_df[['MID', 'Gross Margin %']].rename(columns={'Gross Margin %': f'{month} Margin %'}),
-                on='MID',
-                how='left'
-            )
-    
-    # Rename current month's margin column
-    df = df.rename(columns={'Gross Margin %': f'{selected_month} Margin %'})
-    df['Gross Margin %'] = df[f'{selected_month} Margin %']  # Keep for filtering
-    
-    # Calculate month-to-month changes
-    for i in range(1, len(sorted_months)):
-        prev_month = sorted_months[i-1]
-        curr_month = sorted_months[i]
-        change_col_name = f'Change_{prev_month}_{curr_month}'
-        
-        if f'{prev_month} Margin %' in df.columns and f'{curr_month} Margin %' in df.columns:
-            df[change_col_name] = df[f'{curr_month} Margin %'] - df[f'{prev_month} Margin %']
-    
-    # Apply filters based on current month's margin
-    if filter_type == 'positive':
-        df = df[df['Gross Margin %'] > 0]
-    elif filter_type == 'negative':
-        df = df[df['Gross Margin %'] < 0]
-    elif filter_type == 'high':
-        df = df[df['Gross Margin %'] > 5]
-    elif filter_type == 'low':
-        df = df[df['Gross Margin %'] < 1]
-    elif filter_type == 'improving':
-        # Find the change column that ends with current month
-        for col in df.columns:
-            if col.startswith('Change_') and col.endswith(f'_{selected_month}'):
-                df = df[df[col] > 0]
-                break
-    elif filter_type == 'declining':
-        # Find the change column that ends with current month
-        for col in df.columns:
-            if col.startswith('Change_') and col.endswith(f'_{selected_month}'):
-                df = df[df[col] < 0]
-                break
+    sorted_months = list(frames.keys())
     
-    # Sort by volume descending
-    df = df.sort_values('Total Volume', ascending=False)
-    
-    # Store filtered data for export (include all columns)
-    export_columns = ['MID', 'DBA Name', 'Total Volume', 'Agent Net'] + \
-                    [col for col in df.columns if 'Margin %' in col or col.startswith('Change_')] + \
-                    volume_columns
-    export_columns = [col for col in export_columns if col in df.columns]
-    filtered_data = df[export_columns].to_dict('records')
+    # Selected month with every month's margin and month-to-month change,
+    # filtered on the current month's margin and sorted by volume descending
+    df = mid_view(data, frames, selected_month)
+    df = df.iloc[mid_view_order(data, frames, selected_month, filter_type, threshold=threshold)]
+    record_rows(len(df))
     
     # Create summary stats
     total_records = len(df)
     avg_margin = df['Gross Margin %'].mean()
     total_volume = df['Total Volume'].sum()
     
-    # Count MIDs with data from previous months
-    mids_with_history = 0
-    for month in sorted_months:
-        if month != selected_month and f'{month} Margin %' in df.columns:
-            mids_with_history = df[f'{month} Margin %'].notna().sum()
-            break
+    # Count MIDs with a margin in any earlier month
+    earlier = [f'{month} Margin %' for month in sorted_months[:sorted_months.index(selected_month)]]
+    mids_with_history = int(df[earlier].notna().any(axis=1).sum()) if earlier else 0
     
     stats = dbc.Alert([
         html.H6("Quick Stats", className="alert-heading"),
@@ -895,13 +2996,34 @@ def update_mid_table(selected_month, filter_type, basic_cols, vol_cols, margin_c
                 'format': Format(precision=2, scheme=Scheme.fixed, symbol_suffix='pp')
             })
     
-    # Style conditions for the table
+    # Style conditions for the visible margin and change columns. Wide tables
+    # would need hundreds of these rules; their cells carry a class instead.
+    wide = len(selected_columns) > WIDE_TABLE_COLUMNS
     style_data_conditional = []
-    
-    # Style all margin columns
-    for month in sorted_months:
-        col_id = f'{month} Margin %'
-        if col_id in df.columns:
+    for col in all_available_columns:
+        col_id = col['id']
+        if wide or not is_coloured_column(col_id):
+            continue
+        if col_id.startswith('Change_'):
+            style_data_conditional.extend([
+                {
+                    'if': {
+                        'filter_query': f'{{{col_id}}} > 0',
+                        'column_id': col_id
+                    },
+                    'backgroundColor': '#d1ecf1',
+                    'color': '#0c5460',
+                },
+                {
+                    'if': {
+                        'filter_query': f'{{{col_id}}} < 0',
+                        'column_id': col_id
+                    },
+                    'backgroundColor': '#f8d7da',
+                    'color': '#721c24',
+                }
+            ])
+        else:
             style_data_conditional.extend([
                 {
                     'if': {
@@ -929,53 +3051,56 @@ def update_mid_table(selected_month, filter_type, basic_cols, vol_cols, margin_c
                 }
             ])
     
-    # Style change columns
-    for col in df.columns:
-        if col.startswith('Change_'):
-            style_data_conditional.extend([
-                {
-                    'if': {
-                        'filter_query': f'{{{col}}} > 0',
-                        'column_id': col
-                    },
-                    'backgroundColor': '#d1ecf1',
-                    'color': '#0c5460',
-                },
-                {
-                    'if': {
-                        'filter_query': f'{{{col}}} < 0',
-                        'column_id': col
-                    },
-                    'backgroundColor': '#f8d7da',
-                    'color': '#721c24',
-                }
-            ])
-    
-    # Prepare data for visible columns only
-    table_data = []
-    for record in df.to_dict('records'):
-        row = {}
-        for col in selected_columns:
-            if col in record:
-                row[col] = record[col]
-        table_data.append(row)
+    if wide:
+        # Coloured cells arrive as markdown spans from wide_table_records
+        for col in all_available_columns:
+            if is_coloured_column(col['id']):
+                col['presentation'] = 'markdown'
+        frozen = 0
+        for col in all_available_columns:
+            if col['id'] not in ('MID', 'DBA Name'):
+                break
+            frozen += 1
+        page_size = WIDE_TABLE_PAGE_SIZE
+        layout = dict(
+            virtualization=True,
+            fixed_rows={'headers': True},
+            fixed_columns={'headers': True, 'data': frozen},
+            markdown_options={'html': True},
+            # Virtualized rows need fixed cell sizes
+            style_cell={'textAlign': 'center', 'padding': '10px',
+                        'minWidth': '130px', 'width': '130px', 'maxWidth': '130px'},
+            style_table={'height': '600px', 'overflowY': 'auto', 'minWidth': '100%'},
+        )
+    else:
+        page_size = MID_TABLE_PAGE_SIZE
+        layout = dict(
+            style_cell={'textAlign': 'center', 'padding': '10px'},
+            style_table={'overflowX': 'auto'},
+        )
     
+    # Rows are served a page at a time by update_mid_table_page
     table = dash_table.DataTable(
         id='mid-table',
         columns=all_available_columns,
-        data=table_data,
-        filter_action='native',
-        sort_action='native',
-        page_size=15,
-        style_cell={'textAlign': 'center', 'padding': '10px'},
+        data=[],
+        filter_action='custom',
+        filter_query='',
+        sort_action='custom',
+        sort_mode='single',
+        sort_by=[],
+        page_action='custom',
+        page_current=0,
+        page_size=page_size,
+        page_count=max(1, -(-total_records // page_size)),
         style_header={
             'backgroundColor': '#007bff',
             'color': 'white',
             'fontWeight': 'bold'
         },
         style_data_conditional=style_data_conditional,
-        style_table={'overflowX': 'auto'},
-        tooltip_duration=None
+        tooltip_duration=None,
+        **layout
     )
     
     # Add note about selected columns
@@ -985,18 +3110,219 @@ def update_mid_table(selected_month, filter_type, basic_cols, vol_cols, margin_c
         f"Current month: {selected_month}"
     ], className="text-muted small mt-2")
     
-    return html.Div([stats, table, selected_note]), filtered_data
+    return html.Div([stats, table, selected_note])
 
-@app.callback(
-    Output('download-csv', 'data'),
-    Input('export-button', 'n_clicks'),
-    [State('filtered-mid-data', 'data'), State('month-dropdown', 'value')]
+@instrumented_callback(
+    [Output('mid-table', 'data'), Output('mid-table', 'page_count')],
+    [Input('mid-table', 'page_current'),
+     Input('mid-table', 'page_size'),
+     Input('mid-table', 'sort_by'),
+     Input('mid-table', 'filter_query')],
+    [State('month-dropdown', 'value'),
+     State('filter-dropdown', 'value'),
+     State('margin-threshold', 'value'),
+     State('column-selector', 'value'),
+     State('volume-columns-selector', 'value'),
+     State('margin-columns-selector', 'value'),
+     State('change-columns-selector', 'value'),
+     State('stored-data', 'data')]
 )
-def export_csv(n_clicks, filtered_data, selected_month):
-    if n_clicks and filtered_data:
-        df = pd.DataFrame(filtered_data)
-        return dcc.send_data_frame(df.to_csv, f"gross_margin_{selected_month}_comparison.csv", index=False)
-    return None
+def update_mid_table_page(page_current, page_size, sort_by, filter_query, selected_month, filter_type, threshold,
+                          basic_cols, vol_cols, margin_cols, change_cols, data):
+    frames = load_months(data)
+    if not frames or selected_month not in frames:
+        return [], 1
+    selected_columns = (basic_cols or []) + (vol_cols or []) + (margin_cols or []) + (change_cols or [])
+    page_size = page_size or MID_TABLE_PAGE_SIZE
+    
+    df = mid_view(data, frames, selected_month)
+    order = mid_view_order(data, frames, selected_month, filter_type, filter_query, sort_by, threshold)
+    record_rows(len(order))
+    page_count = max(1, -(-len(order) // page_size))
+    start = min(page_current or 0, page_count - 1) * page_size
+    page = df.iloc[order[start:start + page_size]]
+    
+    # Only send the visible columns of the visible page
+    if len(selected_columns) > WIDE_TABLE_COLUMNS:
+        return wide_table_records(page, selected_columns), page_count
+    return table_records(page, selected_columns), page_count
+
+@instrumented_callback(
+    [Output('export-button', 'href'), Output('export-button', 'disabled')],
+    [Input('stored-data', 'data'),
+     Input('month-dropdown', 'value'),
+     Input('filter-dropdown', 'value'),
+     Input('margin-threshold', 'value'),
+     Input('export-format', 'value')]
+)
+def update_export_link(data, selected_month, filter_type, threshold, export_format):
+    if not data or selected_month not in data.get('months', {}):
+        return None, True
+    params = {'month': selected_month, 'filter': filter_type or 'all', 'format': export_format or 'csv'}
+    if threshold is not None:
+        params['threshold'] = threshold
+    query = urlencode(params)
+    return app.get_relative_path(f"/export/{data['session']}") + '?' + query, False
+
+@app.server.route('/upload', methods=['POST'])
+def upload_file():
+    """Stream one statement to a spool file, ingest it from disk and return its month handle.
+
+    Accepts either a raw request body (optionally chunked) with the file name
+    in the ``filename`` query parameter, or a multipart form with a ``file`` field.
+    """
+    upload = flask.request.files.get('file')
+    filename = upload.filename if upload else flask.request.args.get('filename', '')
+    month_year = extract_month_year(filename)
+    if not month_year:
+        return flask.jsonify({'filename': filename, 'error': 'File name does not contain a month and year'}), 400
+
+    spool_dir = os.path.join(DATA_DIR, 'spool')
+    os.makedirs(spool_dir, exist_ok=True)
+    stream = upload.stream if upload else flask.request.stream
+    hasher = hashlib.blake2b(digest_size=16)
+    spool = tempfile.NamedTemporaryFile(dir=spool_dir, delete=False)
+    try:
+        # Removed below even if reading the body fails, e.g. on a client disconnect
+        with spool:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_BYTES), b''):
+                hasher.update(chunk)
+                spool.write(chunk)
+        digest = hasher.hexdigest()
+        try:
+            if INGEST_WORKERS > 1:
+                df = get_ingest_pool().submit(ingest_workbook, spool.name, digest).result()
+            else:
+                df = ingest_workbook(spool.name, digest)
+        except BrokenProcessPool as exc:
+            reset_ingest_pool()
+            return flask.jsonify({'filename': filename, 'error': str(exc)}), 400
+        except Exception as exc:
+            return flask.jsonify({'filename': filename, 'error': str(exc)}), 400
+    finally:
+        os.remove(spool.name)
+    store_ingested(digest, df)
+    return flask.jsonify({'filename': filename, 'month': month_label(month_year), 'digest': digest})
+
+@app.server.route('/export/<session_id>')
+def export_view(session_id):
+    """Download the filtered MID view of a month as CSV (streamed), Parquet or XLSX.
+
+    The view is recomputed from the server-side data for the session's handle,
+    so nothing has to be shipped to the browser ahead of time.
+    """
+    handle = load_session(session_id)
+    selected_month = flask.request.args.get('month')
+    filter_type = flask.request.args.get('filter', 'all')
+    threshold = flask.request.args.get('threshold', type=float)
+    export_format = flask.request.args.get('format', 'csv')
+    frames = load_months(handle)
+    if selected_month not in frames or export_format not in ('csv', 'parquet', 'xlsx'):
+        flask.abort(404)
+    
+    df = mid_view(handle, frames, selected_month)
+    order = mid_view_order(handle, frames, selected_month, filter_type, threshold=threshold)
+    columns = export_columns(df)
+    filename = f"gross_margin_{selected_month}_comparison.{export_format}"
+    
+    if export_format == 'csv':
+        def generate():
+            yield df.iloc[:0][columns].to_csv(index=False)
+            for start in range(0, len(order), EXPORT_CHUNK_ROWS):
+                yield df.iloc[order[start:start + EXPORT_CHUNK_ROWS]][columns].to_csv(index=False, header=False)
+        return flask.Response(
+            flask.stream_with_context(generate()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    
+    # Parquet and XLSX are spooled to a temporary file rather than built in memory
+    output = tempfile.TemporaryFile()
+    view = df.iloc[order][columns]
+    if export_format == 'parquet':
+        view.to_parquet(output, index=False)
+        mimetype = 'application/vnd.apache.parquet'
+    else:
+        view.to_excel(output, index=False, engine='openpyxl')
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    output.seek(0)
+    return flask.send_file(output, mimetype=mimetype, as_attachment=True, download_name=filename)
+
+@app.server.route('/client-metrics', methods=['POST'])
+def client_metrics():
+    """Record browser timings posted by assets/render_timing.js, when CLIENT_TIMING is on."""
+    if not CLIENT_TIMING:
+        flask.abort(404)
+    body = flask.request.get_json(force=True, silent=True) or {}
+    callback = app.callback_map.get(body.get('output'), {}).get('callback')
+    metric = body.get('metric', 'client_render_seconds')
+    try:
+        seconds = float(body.get('seconds'))
+    except (TypeError, ValueError):
+        seconds = -1.0
+    if callback is None or metric not in ('client_render_seconds', 'time_to_first_kpi_seconds') \
+            or not 0 <= seconds < 3600:
+        return flask.jsonify({'error': 'unknown callback output, metric or bad duration'}), 400
+    callback_metrics.observe(callback.__name__, metric, seconds)
+    return '', 204
+
+# Counters and gauges kept by each process: (type, help, label name or None).
+# /metrics sums them over every worker through MetricFiles.
+PROCESS_METRICS = {
+    'parse_cache_hits_total': ('counter', 'Uploads served from the parse cache.', None),
+    'parse_cache_misses_total': ('counter', 'Uploads that had to be parsed.', None),
+    'artifact_builds_total': ('counter', 'Derived artifacts built, by kind.', 'kind'),
+    'dataset_store_memory_bytes': ('gauge', 'Memory held by month frames in the dataset stores of all workers.', None),
+    'artifact_cache_memory_bytes': ('gauge', 'Memory held by size-bounded derived artifact caches of all workers.',
+                                    'cache'),
+}
+
+def process_metrics():
+    """Snapshot of this process's metrics, in the form merge_metrics adds up."""
+    caches = {'margin_matrix': margin_matrix_cache, 'month_margin': month_margin_cache,
+              'change_column': change_column_cache, 'mid_view': mid_view_cache,
+              'month_activity': month_activity_cache, 'presence': presence_cache}
+    return {
+        'histograms': callback_metrics.state(),
+        'counters': {
+            'parse_cache_hits_total': {'': parse_cache.hits},
+            'parse_cache_misses_total': {'': parse_cache.misses},
+            'artifact_builds_total': dict(artifact_builds),
+        },
+        'gauges': {
+            'dataset_store_memory_bytes': {'': dataset_store.memory_bytes()},
+            'artifact_cache_memory_bytes': {name: cache.memory_bytes() for name, cache in caches.items()},
+        },
+    }
+
+@app.server.route('/cache-stats')
+def cache_stats():
+    stats = parse_cache.stats()
+    counters = metric_files.collect()['counters']
+    hits = counters.get('parse_cache_hits_total', {}).get('', 0)
+    misses = counters.get('parse_cache_misses_total', {}).get('', 0)
+    stats.update(hits=hits, misses=misses, hit_ratio=hits / (hits + misses) if hits + misses else 0.0)
+    return flask.jsonify(stats)
+
+@app.server.route('/metrics')
+def metrics():
+    """Expose callback histograms and cache counters, summed over all workers, in Prometheus text format."""
+    merged = metric_files.collect()
+    lines = [
+        '# HELP parse_cache_bytes Size of the on-disk parse cache.',
+        '# TYPE parse_cache_bytes gauge',
+        f"parse_cache_bytes {parse_cache.stats()['bytes']}",
+    ]
+    for name, (kind, help_text, label) in PROCESS_METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        values = merged['counters' if kind == 'counter' else 'gauges'].get(name, {})
+        if label is None:
+            lines.append(f"{name} {values.get('', 0)}")
+        else:
+            lines += [f'{name}{{{label}="{key}"}} {value}' for key, value in sorted(values.items())]
+    body = callback_metrics.render(merged['histograms']) + '\n'.join(lines) + '\n'
+    return flask.Response(body, mimetype='text/plain; version=0.0.4')
     
 if __name__ == '__main__':
     app.run_server(debug=False, host='0.0.0.0', port=int(os.environ.get('PORT', 8050)))
@@ -0,0 +1,72 @@
+// Client render timing, served only when the app runs with CLIENT_TIMING=1.
+// For every Dash callback response, measures the time from Dash receiving
+// the parsed response until the browser paints the next frame after the
+// update (two animation frames, so layout and
+// paint of the new output are included) and posts it to /client-metrics,
+// where it shows up as dash_callback_client_render_seconds.
+//
+// Time to first KPI: from the first upload request (a dcc.Upload callback or
+// a streamed POST to /upload) to the first painted KPI cards after it,
+// reported as dash_callback_time_to_first_kpi_seconds.
+(function () {
+    var nativeFetch = window.fetch;
+    if (!nativeFetch || !window.requestAnimationFrame) {
+        return;
+    }
+    var UPLOAD_INPUTS = ['upload-data.contents', 'stream-upload-result.data'];
+    var uploadStart = null;
+
+    function report(url, body) {
+        var target = url.replace(/_dash-update-component.*$/, 'client-metrics');
+        body = JSON.stringify(body);
+        if (!navigator.sendBeacon || !navigator.sendBeacon(target, body)) {
+            nativeFetch(target, {method: 'POST', body: body, keepalive: true});
+        }
+    }
+
+    window.fetch = function (input, init) {
+        var url = typeof input === 'string' ? input : input.url;
+        var sent = performance.now();
+        if (/\/upload(\?|$)/.test(url) && uploadStart === null) {
+            uploadStart = sent;
+        }
+        var promise = nativeFetch.apply(this, arguments);
+        if (url.indexOf('_dash-update-component') === -1 || !init || typeof init.body !== 'string') {
+            return promise;
+        }
+        var request;
+        try {
+            request = JSON.parse(init.body);
+        } catch (error) {
+            return promise;
+        }
+        var changed = request.changedPropIds || [];
+        if (uploadStart === null && UPLOAD_INPUTS.some(function (prop) { return changed.indexOf(prop) !== -1; })) {
+            uploadStart = sent;
+        }
+        return promise.then(function (response) {
+            // Start the clock when the body has been parsed, right before
+            // dash-renderer applies the update, so download and JSON parsing
+            // of large responses are not counted as render time.
+            var json = response.json;
+            response.json = function () {
+                return json.apply(response, arguments).then(function (data) {
+                    var start = performance.now();
+                    requestAnimationFrame(function () {
+                        requestAnimationFrame(function () {
+                            var painted = performance.now();
+                            report(url, {output: request.output, seconds: (painted - start) / 1000});
+                            if (uploadStart !== null && request.output === 'kpi-cards.children') {
+                                report(url, {output: request.output, metric: 'time_to_first_kpi_seconds',
+                                             seconds: (painted - uploadStart) / 1000});
+                                uploadStart = null;
+                            }
+                        });
+                    });
+                    return data;
+                });
+            };
+            return response;
+        });
+    };
+})();
@@ -0,0 +1,38 @@
+// Large-file upload path: streams each selected file to the /upload endpoint
+// instead of sending it through dcc.Upload as a base64 data URL, then hands
+// the returned month handles to Dash via the 'stream-upload-result' store.
+document.addEventListener('click', function (event) {
+    var button = event.target.closest('#stream-upload-button');
+    if (!button) {
+        return;
+    }
+    var url = button.closest('[data-upload-url]').getAttribute('data-upload-url');
+    var input = document.createElement('input');
+    input.type = 'file';
+    input.multiple = true;
+    input.accept = '.xls,.xlsx';
+    input.addEventListener('change', function () {
+        var files = Array.prototype.slice.call(input.files);
+        if (!files.length) {
+            return;
+        }
+        button.disabled = true;
+        Promise.all(files.map(function (file) {
+            return fetch(url + '?filename=' + encodeURIComponent(file.name), {
+                method: 'POST',
+                headers: {'Content-Type': 'application/octet-stream'},
+                body: file
+            }).then(function (response) {
+                return response.json();
+            }).catch(function (error) {
+                return {filename: file.name, error: String(error)};
+            });
+        })).then(function (uploads) {
+            button.disabled = false;
+            window.dash_clientside.set_props('stream-upload-result', {
+                data: {uploads: uploads, timestamp: Date.now()}
+            });
+        });
+    });
+    input.click();
+});
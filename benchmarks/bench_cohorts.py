@@ -0,0 +1,85 @@
+"""Benchmark the MID cohort engine on a large synthetic history.
+
+Simulates a merchant base of --mids MIDs over --months months, with MIDs
+joining, churning and coming back. Builds the presence matrix from per-month
+activity and times cohort_counts, which must stay under 100 ms. Checks the
+result against a per-month-pair computation with Python sets.
+
+    python benchmarks/bench_cohorts.py [--mids 100000] [--months 60]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='bench-cohorts-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np  # noqa: E402
+
+import app  # noqa: E402
+
+
+def synthetic_activity(mids, months, seed=0):
+    """``[(active MIDs, volumes), ...]`` per month, in the form month_activity returns."""
+    rng = np.random.default_rng(seed)
+    ids = 1_000_000 + np.arange(mids, dtype=np.int64)
+    joined = rng.integers(0, months, mids)
+    activity = []
+    for month in range(months):
+        active = (joined <= month) & (rng.random(mids) < 0.85)
+        order = rng.permutation(np.flatnonzero(active))
+        activity.append((ids[order], rng.gamma(2.0, 5000.0, len(order)).round(2)))
+    return activity
+
+
+def reference_counts(activity):
+    """Cohort counts computed one month pair at a time with sets."""
+    rows = []
+    seen = set()
+    for (prev_mids, _), (mids, volume) in zip(activity, activity[1:]):
+        seen |= set(prev_mids.tolist())
+        prev, curr = set(prev_mids.tolist()), set(mids.tolist())
+        by_mid = dict(zip(mids.tolist(), volume.tolist()))
+        rows.append({
+            'ACTIVE MIDS': len(curr),
+            'NEW MIDS': len(curr - seen),
+            'REACTIVATED MIDS': len((curr - prev) & seen),
+            'RETAINED MIDS': len(curr & prev),
+            'CHURNED MIDS': len(prev - curr),
+            'VOLUME RETAINED': sum(by_mid[mid] for mid in curr & prev),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mids', type=int, default=100_000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    activity = synthetic_activity(args.mids, args.months)
+    start = time.perf_counter()
+    presence = app.MidPresence(activity)
+    build = time.perf_counter() - start
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        counts = app.cohort_counts(presence.active, presence.volume)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+
+    for i, expected in enumerate(reference_counts(activity)):
+        for col, value in expected.items():
+            assert np.isclose(counts[col][i], value), (i, col, counts[col][i], value)
+
+    print(f'{len(presence.mids):,} MIDs x {args.months} months')
+    print(f'  presence matrix build: {build * 1000:8.1f} ms')
+    print(f'  cohort_counts:         {best * 1000:8.1f} ms (best of {args.repeat})')
+    assert best < 0.1, 'cohort_counts over the 100 ms budget'
+
+
+if __name__ == '__main__':
+    main()
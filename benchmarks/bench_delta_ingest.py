@@ -0,0 +1,64 @@
+"""Time serving a loaded history before and after one month is replaced.
+
+Loads a run of synthetic months and warms every derived artifact the
+dashboard uses: summary rows, figures, the margin matrix, filter indexes and
+volume orders. It then replaces one month in the middle with a corrected
+statement, serves the same views again and reports the artifacts rebuilt.
+tests/test_delta_ingest.py checks which rebuilds are expected.
+
+    python benchmarks/bench_delta_ingest.py [--months 24] [--rows 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='bench-delta-ingest-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from synthetic import ingest, load_history, synthetic_ppi  # noqa: E402
+
+PRESETS = ['all', 'positive', 'high', 'improving', 'declining', 'top']
+
+
+def serve(handle):
+    """Compute everything the dashboard and MID table read for the handle."""
+    frames = app.load_months(handle)
+    app.dashboard_figures(app.summary_frame(handle))
+    app.margin_matrix(handle, frames)
+    for month in frames:
+        for preset in PRESETS:
+            app.filter_positions(handle, frames, month, preset)
+            app.volume_order(handle['months'][month], frames[month])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    handle = load_history(args.months, args.rows)
+    months = app.handle_months(handle)
+    start = time.perf_counter()
+    serve(handle)
+    cold = time.perf_counter() - start
+
+    replaced = months[len(months) // 2]
+    corrected = synthetic_ppi(args.rows, seed=len(months) // 2)
+    corrected['Agent Net'] = corrected['Agent Net'].iloc[::-1].to_numpy()
+    before = app.artifact_builds.copy()
+    ingest(handle, replaced, corrected)
+    start = time.perf_counter()
+    serve(handle)
+    delta = time.perf_counter() - start
+    rebuilt = app.artifact_builds - before
+
+    print(f'{args.months} months x {args.rows:,} rows, replaced {replaced}')
+    print(f'  rebuilt: {dict(sorted(rebuilt.items()))}')
+    print(f'  cold serve {cold * 1000:.0f} ms, after replacing one month {delta * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
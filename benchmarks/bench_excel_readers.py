@@ -0,0 +1,119 @@
+"""Benchmark Excel reader backends on generated PPI workbooks.
+
+Writes synthetic .xlsx workbooks (the PPI columns plus unrelated extras, as
+real statements have) and times each available engine, both for the original
+full-sheet read and for the projected read_ppi_sheet path. No installable
+writer produces .xls under pandas 2, so .xls is timed on the checked-in
+fixtures/ppi_1000.xls: the same layout with 1,000 rows, written once with
+xlwt 1.3.0. Every measurement
+runs in a fresh process; peak memory is the highest resident set size
+sampled during the read, above the process's resident size before it.
+
+    python benchmarks/bench_excel_readers.py [--rows 5000 50000]
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+EXTRA_COLUMNS = 20
+XLS_FIXTURE = os.path.join(ROOT, 'benchmarks', 'fixtures', 'ppi_1000.xls')
+XLS_FIXTURE_ROWS = 1000
+
+
+def make_workbook(rows, path, seed=0):
+    from app import volume_columns
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'MID': rng.integers(10**11, 10**12, rows),
+        'DBA Name': [f'Merchant {i}' for i in range(rows)],
+    })
+    for col in volume_columns:
+        df[col] = rng.integers(0, 5_000_000, rows) / 100
+    df['Agent Net'] = rng.normal(40, 120, rows).round(2)
+    for i in range(EXTRA_COLUMNS):
+        df[f'Extra {i}'] = rng.integers(0, 1000, rows)
+    df = pd.concat([df, pd.DataFrame([{'MID': 'Total'}])], ignore_index=True)
+    df.to_excel(path, sheet_name='PPI', index=False, engine='openpyxl')
+
+
+def rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def measure(path, engine, projected, queue):
+    from app import read_ppi_sheet
+    with open(path, 'rb') as f:
+        raw = f.read()
+    baseline = rss_bytes()
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], rss_bytes())
+            time.sleep(0.002)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    if projected:
+        df = read_ppi_sheet(raw, engine=engine)
+    else:
+        df = pd.read_excel(io.BytesIO(raw), sheet_name='PPI', skipfooter=1, engine=engine)
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    queue.put((elapsed, (peak[0] - baseline) / 2**20, df.shape[1]))
+
+
+def run(path, engine, projected):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=(path, engine, projected, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    from app import CALAMINE_AVAILABLE
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', nargs='+', type=int, default=[5_000, 50_000])
+    args = parser.parse_args()
+
+    formats = {'xlsx': ['openpyxl'], 'xls': ['xlrd']}
+    for engines in formats.values():
+        if CALAMINE_AVAILABLE:
+            engines.append('calamine')
+
+    print(f"{'format':>6} {'rows':>8} {'engine':>10} {'read':>10} {'cols':>5} {'seconds':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, engines in formats.items():
+            for rows in args.rows if fmt == 'xlsx' else [XLS_FIXTURE_ROWS]:
+                if fmt == 'xls':
+                    path = XLS_FIXTURE
+                else:
+                    path = os.path.join(tmp, f'ppi_{rows}.{fmt}')
+                    make_workbook(rows, path)
+                for engine in engines:
+                    for projected in (False, True):
+                        seconds, peak_mb, cols = run(path, engine, projected)
+                        mode = 'PPI cols' if projected else 'full'
+                        print(f'{fmt:>6} {rows:>8,} {engine:>10} {mode:>10} {cols:>5} {seconds:>8.2f} {peak_mb:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark server time to the first KPI cards after an upload.
+
+Loads a history of synthetic months, then uploads one more month as an
+Excel workbook and times the callbacks that run once it is stored. Before
+the dashboard was split, one callback built the KPI cards, the summary table
+and every figure before any of them appeared. Now update_kpis returns on its
+own, and the charts are built only when their section is opened. Each path
+runs on its own history, so neither starts with warm caches.
+
+The browser-side number, from sending the upload to the painted KPI cards,
+is reported with CLIENT_TIMING=1 by assets/render_timing.js as
+dash_callback_time_to_first_kpi_seconds on /metrics.
+
+    python benchmarks/bench_first_kpi.py [--months 24] [--rows 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='bench-first-kpi-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dash  # noqa: E402
+
+import app  # noqa: E402
+from synthetic import load_history, workbook  # noqa: E402
+
+
+def warm_history(months, rows, seed):
+    handle = load_history(months, rows, seed=seed)
+    # The dashboard has been shown for the existing months
+    app.update_kpis(handle)
+    app.update_summary_table(handle)
+    app.update_charts(handle, True)
+    return handle
+
+
+def upload(handle, raw):
+    """Ingest one more month; returns the seconds spent parsing and storing it."""
+    start = time.perf_counter()
+    digest = app.content_hash(raw)
+    app.store_ingested(digest, app.ingest_workbook(raw, digest))
+    month = app.month_label(app.month_period(app.handle_months(handle)[-1]) + 1)
+    app.add_month(handle, month, digest)
+    return time.perf_counter() - start
+
+
+def timed(*steps):
+    start = time.perf_counter()
+    for step in steps:
+        step()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    before_handle = warm_history(args.months, args.rows, seed=0)
+    after_handle = warm_history(args.months, args.rows, seed=1000)
+
+    ingest_before = upload(before_handle, workbook(args.rows, seed=500))
+    before = timed(lambda: app.update_kpis(before_handle),
+                   lambda: app.update_summary_table(before_handle),
+                   lambda: app.update_charts(before_handle, True))
+
+    ingest_after = upload(after_handle, workbook(args.rows, seed=1500))
+    builds = app.artifact_builds.copy()
+    after = timed(lambda: app.update_kpis(after_handle))
+    # Closed sections cost nothing until opened
+    assert app.update_charts(after_handle, False) is dash.no_update
+    assert app.update_cohorts(after_handle, False) is dash.no_update
+    assert app.artifact_builds['figures'] == builds['figures']
+    summary = timed(lambda: app.update_summary_table(after_handle))
+    charts = timed(lambda: app.update_charts(after_handle, True))
+
+    print(f'{args.months} months x {args.rows:,} rows, then one uploaded month')
+    print(f'  parse and store upload:        {ingest_before * 1000:8.1f} / {ingest_after * 1000:.1f} ms')
+    print(f'  first KPI, single callback:    {before * 1000:8.1f} ms')
+    print(f'  first KPI, update_kpis:        {after * 1000:8.1f} ms')
+    print(f'  then summary table:            {summary * 1000:8.1f} ms')
+    print(f'  charts when opened:            {charts * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
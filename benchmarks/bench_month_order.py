@@ -0,0 +1,69 @@
+"""Benchmark month ordering overhead in the column callbacks.
+
+Loads a handle with 60 months (shuffled, as uploads arrive) and times
+update_available_columns and update_column_selector with the old
+dateutil-parse sort and with the month order kept in the handle. Both
+variants must return identical output.
+
+    python benchmarks/bench_month_order.py [--months 60] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='bench-month-order-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd  # noqa: E402
+from dateutil.parser import parse  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+import app  # noqa: E402
+
+
+def legacy_handle_months(handle):
+    """handle_months as it was before month order was kept in the handle."""
+    if not handle or not handle.get('months'):
+        return []
+    return sorted(handle['months'].keys(), key=lambda x: parse(x))
+
+
+def run_callbacks(handle, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        columns = app.update_available_columns(handle)
+        selector = app.update_column_selector(columns, handle)
+    return (time.perf_counter() - start) / repeat, (columns, selector)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    labels = [app.month_label(pd.Period('2020-01', 'M') + i) for i in range(args.months)]
+    random.Random(0).shuffle(labels)
+    handle = app.new_handle()
+    for i, label in enumerate(labels):
+        app.add_month(handle, label, f'{i:032x}')
+    assert app.handle_months(handle) == legacy_handle_months(handle)
+
+    current = app.handle_months
+    try:
+        app.handle_months = legacy_handle_months
+        before, expected = run_callbacks(handle, args.repeat)
+    finally:
+        app.handle_months = current
+    after, result = run_callbacks(handle, args.repeat)
+    assert to_json_plotly(result) == to_json_plotly(expected)
+
+    print(f'{args.months} months, update_available_columns + update_column_selector per call')
+    print(f'  dateutil sort: {before * 1000:8.3f} ms')
+    print(f'  stored order:  {after * 1000:8.3f} ms  ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
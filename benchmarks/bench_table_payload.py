@@ -0,0 +1,66 @@
+"""Benchmark MID table payloads: full-width records versus table_records.
+
+Builds a MID view over several synthetic months and serializes the default
+visible columns plus every margin and change column two ways. The old way
+calls to_dict('records') on the full view and copies the selected keys per
+row. The new way uses table_records. Reports build time and JSON bytes, and
+checks that both agree to display precision.
+
+    python benchmarks/bench_table_payload.py [--sizes 10000 100000] [--months 6]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='bench-table-payload-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+import app  # noqa: E402
+from synthetic import load_history  # noqa: E402
+
+
+def legacy_records(df, columns):
+    """Row payload as update_mid_table used to build it."""
+    return [{col: row[col] for col in columns if col in row} for row in df.to_dict('records')]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    payload = to_json_plotly(result)
+    return result, len(payload), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000])
+    parser.add_argument('--months', type=int, default=6)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'before ms':>10} {'before MB':>10} {'after ms':>9} {'after MB':>9}")
+    for rows in args.sizes:
+        handle = load_history(args.months, rows, same_merchants=True)
+        view = app.mid_view(handle, app.load_months(handle), app.handle_months(handle)[-1])
+        columns = app.default_visible_columns + \
+            [col for col in view.columns if 'Margin %' in col or col.startswith('Change_')]
+        expected, before_bytes, before = timed(legacy_records, view, columns)
+        result, after_bytes, after = timed(app.table_records, view, columns)
+
+        check = pd.DataFrame(result, columns=columns)
+        reference = pd.DataFrame(expected, columns=columns)
+        numeric = check.select_dtypes('number').columns
+        np.testing.assert_allclose(check[numeric].to_numpy(float), reference[numeric].to_numpy(float),
+                                   atol=0.5 * 10 ** -app.DISPLAY_PRECISION, equal_nan=True)
+        assert check.drop(columns=numeric).equals(reference.drop(columns=numeric))
+
+        print(f'{len(view):>8,} {before * 1000:>10.1f} {before_bytes / 1e6:>10.2f} '
+              f'{after * 1000:>9.1f} {after_bytes / 1e6:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
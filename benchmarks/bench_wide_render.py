@@ -0,0 +1,167 @@
+"""Measure browser render time of 'Select All' in the MID table, regular vs wide mode.
+
+Starts `gunicorn app:server` with CLIENT_TIMING=1 twice: once with wide mode
+disabled (WIDE_TABLE_COLUMNS above any selection, the table as it was before
+wide mode) and once with the default threshold. For each run it uploads
+synthetic months of the same merchants (as bench_wide_table.py uses, so
+every margin and change cell is filled) through /upload, loads them into a
+headless Chromium page, picks the latest month and clicks 'Select All' and
+'Reset Default' in turn. For the callbacks each 'Select All' click triggers
+it reports, from /metrics, dash_callback_client_render_seconds (the time
+from Dash applying their responses to the next painted frame) and
+dash_callback_response_bytes (the MID table layout and its first page).
+
+Needs Playwright and its Chromium build:
+
+    pip install playwright && python -m playwright install chromium
+    python benchmarks/bench_wide_render.py [--months 36] [--rows 20000] [--repeats 5]
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import requests
+from playwright.sync_api import sync_playwright
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from synthetic import history, sheet_workbook  # noqa: E402
+
+CALLBACK_METRIC = re.compile(r'dash_callback_(client_render_seconds|response_bytes)_(sum|count)\{callback="(\w+)"\} (\S+)')
+MODES = [('regular', '1000000'), ('wide', None)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(data_dir, wide_table_columns):
+    port = free_port()
+    env = dict(os.environ, DATA_DIR=data_dir, INGEST_WORKERS='1', CLIENT_TIMING='1')
+    env.pop('WIDE_TABLE_COLUMNS', None)
+    if wide_table_columns is not None:
+        env['WIDE_TABLE_COLUMNS'] = wide_table_columns
+    # One worker, so every browser sample lands in the process /metrics reads
+    proc = subprocess.Popen(
+        ['gunicorn', 'app:server', '--workers', '1', '--threads', '4', '--timeout', '300',
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(300):
+        try:
+            if requests.get(url + '/_dash-layout', timeout=5).ok:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def callback_totals(url):
+    """Return a Counter of ``(metric, 'sum' or 'count', callback)`` for client render time and response size."""
+    totals = Counter()
+    for metric, kind, callback, value in CALLBACK_METRIC.findall(requests.get(url + '/metrics', timeout=30).text):
+        totals[metric, kind, callback] += float(value)
+    return totals
+
+
+def settle(page, url):
+    """Wait until Dash has no callback in flight and the browser's samples have reached the server."""
+    page.wait_for_load_state('networkidle')
+    page.wait_for_function("() => !document.querySelector('[data-dash-is-loading=\"true\"]')")
+    # render_timing.js reports two animation frames after each response
+    page.wait_for_timeout(500)
+    page.wait_for_load_state('networkidle')
+    return callback_totals(url)
+
+
+def upload_months(url, months, rows):
+    """Upload synthetic months of the same merchants and return a dataset handle for them."""
+    handle = {'session': os.urandom(16).hex(), 'months': {}, 'order': []}
+    for label, raw in history(months, rows, same_merchants=True):
+        response = requests.post(url + '/upload', params={'filename': f'Residual Report - {label}.xls'},
+                                 data=sheet_workbook(raw), timeout=300)
+        response.raise_for_status()
+        handle['months'][label] = response.json()['digest']
+        handle['order'].append(label)
+    return handle
+
+
+def measure(browser, url, handle, repeats):
+    """Callback metric totals added by ``repeats`` 'Select All' clicks (see callback_totals)."""
+    context = browser.new_context(viewport={'width': 1600, 'height': 1000})
+    # Open the page with the uploaded months already in the browser's dataset handle
+    context.add_init_script(
+        f"localStorage.setItem('stored-data', {json.dumps(json.dumps(handle))});"
+        f"localStorage.setItem('stored-data-timestamp', '{int(time.time() * 1000)}');"
+    )
+    page = context.new_page()
+    page.goto(url)
+    page.wait_for_selector('#file-list .badge')
+    latest = handle['order'][-1]
+    page.click('#month-dropdown')
+    page.locator('#month-dropdown .VirtualizedSelectOption', has_text=latest).click()
+    page.wait_for_selector('#mid-table')
+    settle(page, url)
+    totals = Counter()
+    for _ in range(repeats):
+        before = settle(page, url)
+        page.click('#select-all-btn')
+        totals.update(settle(page, url) - before)
+        page.click('#reset-default-btn')
+    context.close()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch()
+        try:
+            for mode, wide_table_columns in MODES:
+                proc, url = start_server(tempfile.mkdtemp(prefix='bench-wide-render-'), wide_table_columns)
+                try:
+                    handle = upload_months(url, args.months, args.rows)
+                    results[mode] = measure(browser, url, handle, args.repeats)
+                finally:
+                    proc.terminate()
+                    proc.wait()
+        finally:
+            browser.close()
+
+    print(f'{args.months} months x {args.rows:,} rows, {args.repeats} Select All clicks per mode')
+    print(f"{'mode':>8} {'callback':>22} {'renders':>8} {'render ms':>10} {'KB/click':>9}")
+    for mode, totals in results.items():
+        callbacks = sorted({callback for _, _, callback in totals})
+        for callback in callbacks:
+            render_seconds = totals['client_render_seconds', 'sum', callback]
+            print(f"{mode:>8} {callback:>22} {totals['client_render_seconds', 'count', callback]:>8.0f} "
+                  f'{render_seconds / args.repeats * 1000:>10.1f} '
+                  f"{totals['response_bytes', 'sum', callback] / args.repeats / 1e3:>9.1f}")
+        render_seconds = sum(v for (metric, kind, _), v in totals.items()
+                             if metric == 'client_render_seconds' and kind == 'sum')
+        response_bytes = sum(v for (metric, kind, _), v in totals.items()
+                             if metric == 'response_bytes' and kind == 'sum')
+        print(f"{mode:>8} {'all callbacks':>22} {'':>8} {render_seconds / args.repeats * 1000:>10.1f} "
+              f'{response_bytes / args.repeats / 1e3:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
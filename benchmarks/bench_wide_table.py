@@ -0,0 +1,80 @@
+"""Benchmark the MID table with every column selected ('Select All').
+
+Loads synthetic months and builds the table twice: in the regular mode, with
+one style_data_conditional rule set per coloured column, and in the wide mode,
+with virtualized rows and colour classes sent with the cells. Reports the
+number of style rules, the table layout size and the first page payload for
+each. benchmarks/bench_wide_render.py measures the browser render time of
+the same 'Select All' in headless Chromium.
+
+    python benchmarks/bench_wide_table.py [--months 36] [--rows 20000]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='bench-wide-table-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+import app  # noqa: E402
+from synthetic import load_history  # noqa: E402
+
+
+def build_table(handle, month, selection):
+    start = time.perf_counter()
+    container = app.update_mid_table(month, 'all', None, *selection, handle)
+    table = container.children[1]
+    page = app.update_mid_table_page(0, table.page_size, [], '', month, 'all', None, *selection, handle)
+    elapsed = time.perf_counter() - start
+    return table, page, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    handle = load_history(args.months, args.rows, same_merchants=True)
+    month = app.handle_months(handle)[-1]
+    columns = app.update_available_columns(handle)
+    # 'Select All': every option of the four column checklists
+    options = app.update_column_selector(columns, handle)[0:8:2]
+    selection = tuple([opt['value'] for opt in group] for group in options)
+    selected = sum(len(values) for values in selection)
+
+    # Build the shared MID view before timing either mode
+    build_table(handle, month, selection)
+    wide_columns = app.WIDE_TABLE_COLUMNS
+    try:
+        app.WIDE_TABLE_COLUMNS = selected
+        regular, regular_page, regular_time = build_table(handle, month, selection)
+    finally:
+        app.WIDE_TABLE_COLUMNS = wide_columns
+    wide, wide_page, wide_time = build_table(handle, month, selection)
+    assert not wide.style_data_conditional and wide.virtualization
+
+    # Wide cells show the regular table's values to display precision
+    records, _ = wide_page
+    reference, _ = regular_page
+    for col in (c for c in records[0] if app.is_coloured_column(c)):
+        shown = [float(re.sub(r'<[^>]+>|%|pp', '', r[col])) if r[col] is not None else np.nan for r in records]
+        expected = [r[col] if r[col] is not None else np.nan for r in reference]
+        np.testing.assert_allclose(shown[:len(expected)], expected, atol=0.5 * 10 ** -app.DISPLAY_PRECISION,
+                                   equal_nan=True)
+
+    print(f'{args.months} months x {args.rows:,} rows, {selected} columns selected')
+    print(f"{'mode':>8} {'rules':>6} {'layout KB':>10} {'rows/page':>10} {'page KB':>8} {'server ms':>10}")
+    for name, table, (page, _), elapsed in (('regular', regular, regular_page, regular_time),
+                                            ('wide', wide, wide_page, wide_time)):
+        print(f'{name:>8} {len(table.style_data_conditional):>6} {len(to_json_plotly(table)) / 1e3:>10.1f} '
+              f'{len(page):>10} {len(to_json_plotly(page)) / 1e3:>8.1f} {elapsed * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Load test the dashboard callbacks under gunicorn with a growing worker count.
+
+Starts `gunicorn app:server` once per worker count, all runs sharing one
+DATA_DIR. It uploads a few synthetic months through /upload, then has
+concurrent clients post Dash callback requests: the KPI cards, the opened
+charts section and MID table pages with varying page, sort and filter. Reports p50/p95 latency
+per callback for each worker count.
+
+    python benchmarks/load_test.py [--workers 1 2 4] [--clients 16] [--requests 400]
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from synthetic import workbook  # noqa: E402
+
+SORTS = [[], [{'column_id': 'Agent Net', 'direction': 'asc'}], [{'column_id': 'Gross Margin %', 'direction': 'desc'}]]
+FILTERS = ['all', 'positive', 'high', 'improving', 'top']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, data_dir):
+    port = free_port()
+    env = dict(os.environ, DATA_DIR=data_dir, INGEST_WORKERS='1')
+    proc = subprocess.Popen(
+        ['gunicorn', 'app:server', '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(300):
+        try:
+            if requests.get(url + '/_dash-layout', timeout=5).ok:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def kpi_request(handle):
+    return {
+        'output': 'kpi-cards.children',
+        'outputs': {'id': 'kpi-cards', 'property': 'children'},
+        'inputs': [{'id': 'stored-data', 'property': 'data', 'value': handle}],
+        'changedPropIds': ['stored-data.data'],
+        'state': [],
+    }
+
+
+def charts_request(handle):
+    return {
+        'output': 'charts-section.children',
+        'outputs': {'id': 'charts-section', 'property': 'children'},
+        'inputs': [{'id': 'stored-data', 'property': 'data', 'value': handle},
+                   {'id': 'charts-collapse', 'property': 'is_open', 'value': True}],
+        'changedPropIds': ['stored-data.data'],
+        'state': [],
+    }
+
+
+def mid_page_request(handle, rng):
+    month = rng.choice(handle['order'])
+    return {
+        'output': '..mid-table.data...mid-table.page_count..',
+        'outputs': [{'id': 'mid-table', 'property': 'data'}, {'id': 'mid-table', 'property': 'page_count'}],
+        'inputs': [
+            {'id': 'mid-table', 'property': 'page_current', 'value': rng.randrange(20)},
+            {'id': 'mid-table', 'property': 'page_size', 'value': 15},
+            {'id': 'mid-table', 'property': 'sort_by', 'value': rng.choice(SORTS)},
+            {'id': 'mid-table', 'property': 'filter_query', 'value': ''},
+        ],
+        'changedPropIds': ['mid-table.page_current'],
+        'state': [
+            {'id': 'month-dropdown', 'property': 'value', 'value': month},
+            {'id': 'filter-dropdown', 'property': 'value', 'value': rng.choice(FILTERS)},
+            {'id': 'margin-threshold', 'property': 'value', 'value': None},
+            {'id': 'column-selector', 'property': 'value', 'value': ['MID', 'DBA Name', 'Total Volume', 'Agent Net']},
+            {'id': 'volume-columns-selector', 'property': 'value', 'value': []},
+            {'id': 'margin-columns-selector', 'property': 'value', 'value': [f'{month} Margin %']},
+            {'id': 'change-columns-selector', 'property': 'value', 'value': []},
+            {'id': 'stored-data', 'property': 'data', 'value': handle},
+        ],
+    }
+
+
+def run_load(url, handle, clients, total, seed):
+    rng = random.Random(seed)
+    jobs = []
+    for _ in range(total):
+        draw = rng.random()
+        if draw < 0.15:
+            jobs.append(('kpis', kpi_request(handle)))
+        elif draw < 0.3:
+            jobs.append(('charts', charts_request(handle)))
+        else:
+            jobs.append(('mid_table_page', mid_page_request(handle, rng)))
+    local = threading.local()
+
+    def call(job):
+        name, payload = job
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        response = local.session.post(url + '/_dash-update-component', json=payload, timeout=60)
+        response.raise_for_status()
+        return name, time.perf_counter() - start
+
+    with ThreadPoolExecutor(clients) as pool:
+        return list(pool.map(call, jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--months', type=int, default=6)
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='load-test-')
+    handle = None
+    print(f"{'workers':>7} {'callback':>15} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for workers in args.workers:
+        proc, url = start_server(workers, data_dir)
+        try:
+            if handle is None:
+                handle = {'session': uuid.uuid4().hex, 'months': {}, 'order': []}
+                for i in range(args.months):
+                    label = (pd.Period('2024-01', 'M') + i).strftime('%B %Y')
+                    response = requests.post(url + '/upload', params={'filename': f'Residual Report - {label}.xls'},
+                                             data=workbook(args.rows, seed=i), timeout=300)
+                    response.raise_for_status()
+                    handle['months'][label] = response.json()['digest']
+                    handle['order'].append(label)
+            # Warm each worker's caches before timing
+            run_load(url, handle, args.clients, args.clients * workers, seed=0)
+            results = run_load(url, handle, args.clients, args.requests, seed=workers)
+        finally:
+            proc.terminate()
+            proc.wait()
+        for name in ('kpis', 'charts', 'mid_table_page'):
+            latencies = np.array([seconds for call, seconds in results if call == name]) * 1000
+            if len(latencies):
+                p50, p95 = np.percentile(latencies, [50, 95])
+                print(f'{workers:>7} {name:>15} {len(latencies):>6} {p50:>8.1f} {p95:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Memory report for compact month frames.
+
+Cleans synthetic PPI months, stores them with compact_month and reports bytes
+per month and per MID before and after. tests/test_compact_dtypes.py checks
+that the compact frames round-trip exactly.
+
+    python benchmarks/memory_report.py [--months 36] [--rows 40000]
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import clean_data, compact_month  # noqa: E402
+from synthetic import synthetic_ppi  # noqa: E402
+
+
+def memory_report(frames):
+    """Bytes per month and per MID for an ordered mapping of month frames."""
+    rows = []
+    for month, df in frames.items():
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        rows.append({'MONTH': month, 'MIDS': len(df), 'BYTES': size,
+                     'BYTES PER MID': size / len(df) if len(df) else 0.0})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--rows', type=int, default=40_000)
+    args = parser.parse_args()
+
+    cleaned, compact = {}, {}
+    for i in range(args.months):
+        month = pd.Period('2022-01', 'M') + i
+        label = month.strftime('%B %Y')
+        cleaned[label] = clean_data(synthetic_ppi(args.rows, seed=i)).reset_index(drop=True)
+        compact[label] = compact_month(cleaned[label])
+
+    before, after = memory_report(cleaned), memory_report(compact)
+    report = before[['MONTH', 'MIDS']].assign(
+        **{'BYTES BEFORE': before['BYTES'], 'BYTES AFTER': after['BYTES'],
+           'PER MID BEFORE': before['BYTES PER MID'].round(1),
+           'PER MID AFTER': after['BYTES PER MID'].round(1)}
+    )
+    print(report.to_string(index=False))
+    print()
+    print(compact[report['MONTH'].iloc[-1]].dtypes.to_string())
+    print()
+    total_before, total_after = before['BYTES'].sum(), after['BYTES'].sum()
+    print(f'Total: {total_before / 2**20:,.1f} MB -> {total_after / 2**20:,.1f} MB '
+          f'({total_before / total_after:.1f}x smaller)')
+
+
+if __name__ == '__main__':
+    main()
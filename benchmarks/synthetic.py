@@ -0,0 +1,88 @@
+"""Synthetic PPI statements shared by the benchmarks.
+
+synthetic_ppi builds a raw sheet as read_excel would return it, workbook and
+sheet_workbook write one as an uploaded .xlsx report, history yields a run of
+monthly sheets, and ingest/load_history clean and store sheets as months of a
+dataset handle. Benchmarks that store months set DATA_DIR before importing
+this module, since it imports app.
+"""
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from app import clean_data, volume_columns  # noqa: E402
+
+
+def synthetic_ppi(rows, seed=0):
+    """Return a raw PPI sheet as read_excel would produce it."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'MID': rng.integers(10**11, 10**12, rows).astype(str).astype(object),
+        'DBA Name': [f'Merchant {i}' for i in range(rows)],
+    })
+    for col in volume_columns:
+        cents = rng.integers(0, 5_000_000, rows)
+        cents[rng.random(rows) < 0.4] = 0
+        df[col] = [f'${c // 100:,}.{c % 100:02d}' for c in cents]
+    net = rng.normal(40, 120, rows).round(2)
+    df['Agent Net'] = [f'${x:,.2f}' if x >= 0 else f'-${-x:,.2f}' for x in net]
+    # Sprinkle in the rows clean_data has to drop
+    df.loc[rng.choice(rows, max(1, rows // 1000), replace=False), 'MID'] = 'Sub Total'
+    df.loc[rng.choice(rows, max(1, rows // 1000), replace=False), 'MID'] = None
+    dupes = rng.choice(rows, max(1, rows // 500), replace=False)
+    df.loc[dupes, 'MID'] = df.loc[(dupes + 1) % rows, 'MID'].to_numpy()
+    return df
+
+
+def workbook(rows, seed):
+    """Return synthetic_ppi as the bytes of an uploaded .xlsx report."""
+    return sheet_workbook(synthetic_ppi(rows, seed=seed))
+
+
+def sheet_workbook(df):
+    """Return a raw PPI sheet as the bytes of an uploaded .xlsx report."""
+    # read_ppi_sheet drops the sheet's last row, the report's grand total
+    df = pd.concat([df, pd.DataFrame([{'MID': 'Grand Total'}])], ignore_index=True)
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='PPI', index=False)
+    return buf.getvalue()
+
+
+def ingest(handle, month, raw):
+    """Clean and store a raw sheet and add it to the handle as month."""
+    df = app.compact_month(clean_data(raw.copy()).reset_index(drop=True))
+    digest = app.content_hash(pd.util.hash_pandas_object(df).to_numpy().tobytes())
+    app.store_ingested(digest, df)
+    app.add_month(handle, month, digest)
+
+
+def history(months, rows, seed=0, same_merchants=False):
+    """Yield ``(month label, raw sheet)`` for consecutive months from 2022-01 on.
+
+    Each month is synthetic_ppi with its own seed, or with same_merchants,
+    the first month's MIDs every month with the amounts shuffled. The same
+    frame is reused between months, so use each sheet before the next one.
+    """
+    raw = synthetic_ppi(rows, seed=seed)
+    rng = np.random.default_rng(seed)
+    for i in range(months):
+        if not same_merchants:
+            raw = synthetic_ppi(rows, seed=seed + i)
+        elif i:
+            for col in volume_columns + ['Agent Net']:
+                raw[col] = raw[col].sample(frac=1, random_state=int(rng.integers(1 << 31))).to_numpy()
+        yield app.month_label(pd.Period('2022-01', 'M') + i), raw
+
+
+def load_history(months, rows, seed=0, same_merchants=False):
+    """Return a handle with the months of history() ingested."""
+    handle = app.new_handle()
+    for month, raw in history(months, rows, seed=seed, same_merchants=same_merchants):
+        ingest(handle, month, raw)
+    return handle
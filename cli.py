@@ -0,0 +1,123 @@
+"""Headless batch run of the dashboard's ingest and summary logic.
+
+Reads every '... - Month YYYY.xls' statement in a directory, ingests them in
+parallel through the same parse cache and cleaning code as the app, and
+writes four tables:
+
+    summary  - one row per month, as in the dashboard's summary table
+    margins  - MID x month Gross Margin %
+    changes  - MID x month-over-month margin change
+    cohorts  - new, reactivated, retained and churned MIDs per month
+
+    python cli.py STATEMENT_DIR [--output OUT_DIR] [--format parquet|csv] [--workers N]
+"""
+import argparse
+import os
+import sys
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', help='directory of "... - Month YYYY.xls" statements')
+    parser.add_argument('--output', default='output', help='directory to write the tables to (default: output)')
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--workers', type=int, help='ingest processes (default: INGEST_WORKERS or CPU count)')
+    return parser.parse_args(argv)
+
+
+def find_statements(directory):
+    """Return ``[(month label, path), ...]`` for statements in ``directory``, by file name."""
+    from app import extract_month_year, month_label
+    statements = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        month_year = extract_month_year(name)
+        if month_year is None:
+            if os.path.isfile(path):
+                print(f'skipping {name}: file name does not contain a month and year', file=sys.stderr)
+            continue
+        statements.append((month_label(month_year), path))
+    return statements
+
+
+def ingest_statements(statements):
+    """Ingest statement files in parallel and return a handle over their months.
+
+    A month named by more than one file takes the last file in name order,
+    as when the same months are uploaded in one batch in the app.
+    """
+    import app
+    handle = app.new_handle()
+    digests = []
+    for _, path in statements:
+        with open(path, 'rb') as f:
+            digests.append(app.content_hash(f.read()))
+    if app.INGEST_WORKERS > 1 and len(statements) > 1:
+        pool = app.get_ingest_pool()
+        futures = [pool.submit(app.ingest_workbook, path, digest) for (_, path), digest in zip(statements, digests)]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                results.append(exc)
+    else:
+        results = []
+        for (_, path), digest in zip(statements, digests):
+            try:
+                results.append(app.ingest_workbook(path, digest))
+            except Exception as exc:
+                results.append(exc)
+    failed = 0
+    for (month, path), digest, result in zip(statements, digests, results):
+        if isinstance(result, Exception):
+            print(f'could not read {os.path.basename(path)}: {result}', file=sys.stderr)
+            failed += 1
+            continue
+        app.store_ingested(digest, result)
+        if month in handle['months']:
+            print(f'{month}: {os.path.basename(path)} replaces an earlier file', file=sys.stderr)
+        app.add_month(handle, month, digest)
+    return handle, failed
+
+
+def write_table(df, output, name, fmt):
+    path = os.path.join(output, f'{name}.{fmt}')
+    if fmt == 'parquet':
+        df.to_parquet(path)
+    else:
+        df.to_csv(path)
+    return path
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers:
+        os.environ['INGEST_WORKERS'] = str(args.workers)
+    import app
+
+    statements = find_statements(args.directory)
+    if not statements:
+        print(f'no statements found in {args.directory}', file=sys.stderr)
+        return 1
+    handle, failed = ingest_statements(statements)
+    if not handle['months']:
+        return 1
+
+    frames = app.load_months(handle)
+    summary = app.summary_frame(handle).set_index('MONTH')
+    matrix = app.margin_matrix(handle, frames).rename_axis('MID')
+    margins = matrix[[col for col in matrix.columns if col.endswith(' Margin %')]]
+    changes = matrix[[col for col in matrix.columns if col.startswith('Change_')]]
+    cohorts = app.cohort_frame(handle, frames)
+    cohorts = cohorts.set_index('MONTH') if not cohorts.empty else cohorts
+
+    os.makedirs(args.output, exist_ok=True)
+    for name, df in (('summary', summary), ('margins', margins), ('changes', changes), ('cohorts', cohorts)):
+        print(write_table(df, args.output, name, args.format))
+    print(f'{len(frames)} months, {len(matrix):,} MIDs, {failed} files failed', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
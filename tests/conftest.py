@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# app reads DATA_DIR at import time. Always start from an empty one: tests that
+# count artifact builds fail when summaries or figures come from an earlier
+# run's shared cache, and tests must never write into a real DATA_DIR.
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='merchant-dashboard-tests-')
+os.environ.setdefault('INGEST_WORKERS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
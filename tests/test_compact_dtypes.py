@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import (clean_data, compact_money, compact_month, expand_month, money_columns, month_column,
+                 read_frame, volume_columns, write_frame)
+
+
+def raw_sheet(mids, names=None):
+    """A raw PPI sheet with one row per MID and currency strings for every amount."""
+    rows = len(mids)
+    rng = np.random.default_rng(rows)
+    df = pd.DataFrame({'MID': mids, 'DBA Name': names or [f'Merchant {i % 3}' for i in range(rows)]})
+    for col in volume_columns:
+        df[col] = [f'${c / 100:,.2f}' for c in rng.integers(0, 5_000_000, rows)]
+    df['Agent Net'] = [f'${x:,.2f}' if x >= 0 else f'-${-x:,.2f}' for x in rng.normal(40, 120, rows).round(2)]
+    return df
+
+
+def test_whole_cents_are_stored_as_int32():
+    values = np.array([0.0, 0.01, 1234.56, -99.99, 21_474_836.47])
+    compact = compact_money(values)
+    assert compact.dtype == np.int32
+    np.testing.assert_array_equal(compact / 100, values)
+
+
+def test_cents_with_nan_are_stored_as_float32():
+    values = np.array([0.01, np.nan, 1234.56, -99.99])
+    compact = compact_money(values)
+    assert compact.dtype == np.float32
+    np.testing.assert_array_equal(np.round(compact.astype(np.float64), 2), values)
+
+
+def test_values_beyond_cent_precision_stay_float64():
+    values = np.array([0.125, 1 / 3, 1e12 + 0.01])
+    compact = compact_money(values)
+    assert compact.dtype == np.float64
+    np.testing.assert_array_equal(compact, values)
+
+
+def test_month_round_trips_exactly():
+    cleaned = clean_data(raw_sheet([str(n) for n in range(10**11, 10**11 + 500)])).reset_index(drop=True)
+    compact = compact_month(cleaned)
+    assert compact['MID'].dtype == np.int64
+    assert isinstance(compact['DBA Name'].dtype, pd.CategoricalDtype)
+    assert all(compact[col].dtype != np.float64 for col in volume_columns + ['Agent Net'])
+    restored = expand_month(compact)
+    pd.testing.assert_frame_equal(restored, cleaned)
+    for col in ('Total Volume', 'Agent Net', 'Gross Margin %'):
+        assert restored[col].sum() == cleaned[col].sum()
+
+
+def test_dba_names_keep_their_values():
+    # Empty cells come back from read_excel as NaN
+    names = ['Acme', np.nan, 'Acme', 'Bob & Sons', '']
+    cleaned = clean_data(raw_sheet([str(n) for n in range(1, 6)], names)).reset_index(drop=True)
+    compact = compact_month(cleaned)
+    assert list(compact['DBA Name'].cat.categories) == ['', 'Acme', 'Bob & Sons']
+    pd.testing.assert_series_equal(month_column(compact, 'DBA Name'), cleaned['DBA Name'])
+
+
+@pytest.mark.parametrize('mids', [
+    ['000123', '123', '0456'],
+    ['12', 'ABC-7', '012'],
+    ['0'],
+])
+def test_non_canonical_mids_are_not_stored_as_integers(mids):
+    cleaned = clean_data(raw_sheet(mids)).reset_index(drop=True)
+    compact = compact_month(cleaned)
+    assert compact['MID'].dtype != np.int64
+    pd.testing.assert_series_equal(month_column(compact, 'MID'), cleaned['MID'].astype(str))
+
+
+def test_int64_mids_round_trip_through_the_warehouse_format(tmp_path):
+    mids = ['1', '987654321012', '999999999999999999']
+    cleaned = clean_data(raw_sheet(mids)).reset_index(drop=True)
+    compact = compact_month(cleaned)
+    assert compact['MID'].dtype == np.int64
+    path = write_frame(str(tmp_path / 'month'), compact, compression='uncompressed')
+    stored = read_frame(path, memory_map=True)
+    assert [stored[col].dtype for col in money_columns] == [compact[col].dtype for col in money_columns]
+    pd.testing.assert_frame_equal(expand_month(stored), cleaned)
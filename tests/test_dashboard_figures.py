@@ -0,0 +1,26 @@
+import orjson
+import pandas as pd
+
+from app import build_dashboard_figures
+
+COLUMNS = ['MONTH', 'TOTAL MIDS', 'PROCESSING MIDS', 'POSITIVE NET MIDS', 'TOTAL PROFIT', 'MID VOLUME']
+
+
+def summary(*rows):
+    return pd.DataFrame(list(rows), columns=COLUMNS)
+
+
+def test_empty_summary_builds_an_empty_gauge():
+    figures = build_dashboard_figures(summary())
+    gauge = orjson.loads(figures['gauge'])
+    assert gauge['data'] == []
+    assert gauge['layout']['height'] == 300
+
+
+def test_gauge_shows_the_latest_margin_against_the_month_before():
+    figures = build_dashboard_figures(summary(['January 2024', 10, 8, 6, 100.0, 10_000.0],
+                                              ['February 2024', 12, 9, 7, 300.0, 10_000.0]))
+    indicator, = orjson.loads(figures['gauge'])['data']
+    assert indicator['value'] == 3.0
+    assert indicator['delta']['reference'] == 1.0
+    assert indicator['title']['text'] == 'Overall Profit Margin % (February 2024)'
@@ -0,0 +1,98 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+PRESETS = ['all', 'positive', 'high', 'improving', 'declining', 'top']
+
+# Each test draws its months from its own seeds, so none of their artifacts is cached yet
+_seeds = itertools.count(0, 1000)
+
+
+def month_frame(seed, rows=300):
+    """A cleaned, compact month of the same merchants with amounts drawn from ``seed``."""
+    rng = np.random.default_rng(seed)
+    raw = pd.DataFrame({'MID': [str(10**11 + i) for i in range(rows)],
+                        'DBA Name': [f'Merchant {i}' for i in range(rows)]})
+    for col in app.volume_columns:
+        raw[col] = rng.integers(0, 5_000_000, rows) / 100
+    raw['Agent Net'] = rng.normal(40, 120, rows).round(2)
+    return app.compact_month(app.clean_data(raw).reset_index(drop=True))
+
+
+def ingest(handle, month, df):
+    digest = app.content_hash(pd.util.hash_pandas_object(df).to_numpy().tobytes())
+    app.store_ingested(digest, df)
+    app.add_month(handle, month, digest)
+
+
+def serve(handle):
+    """Compute everything the dashboard and MID table read for the handle."""
+    frames = app.load_months(handle)
+    app.dashboard_figures(app.summary_frame(handle))
+    app.margin_matrix(handle, frames)
+    for month in frames:
+        for preset in PRESETS:
+            app.filter_positions(handle, frames, month, preset)
+            app.volume_order(handle['months'][month], frames[month])
+
+
+def rebuilds(handle, month, df):
+    """Artifact builds caused by storing ``df`` as ``month`` and serving the handle again."""
+    before = app.artifact_builds.copy()
+    ingest(handle, month, df)
+    serve(handle)
+    return dict(app.artifact_builds - before)
+
+
+@pytest.fixture
+def history():
+    """A handle with six months whose artifacts have all been built, and its first seed."""
+    seed = next(_seeds)
+    handle = app.new_handle()
+    for i in range(6):
+        ingest(handle, app.month_label(pd.Period('2023-01', 'M') + i), month_frame(seed + i))
+    serve(handle)
+    return handle, seed
+
+
+def test_replacing_a_month_rebuilds_only_its_artifacts(history):
+    handle, seed = history
+    assert rebuilds(handle, 'March 2023', month_frame(seed + 100)) == {
+        'summary': 1,
+        'margin_index': 1,
+        'volume_order': 1,
+        'month_margins': 1,
+        # The changes into and out of March
+        'change_column': 2,
+        # improving/declining for March and for April
+        'change_filter': 4,
+        'figures': 1,
+    }
+
+
+def test_replacing_the_latest_month_rebuilds_one_change_column(history):
+    handle, seed = history
+    rebuilt = rebuilds(handle, 'June 2023', month_frame(seed + 100))
+    assert rebuilt['change_column'] == 1
+    assert rebuilt['change_filter'] == 2
+
+
+def test_uploading_the_same_month_again_rebuilds_nothing(history):
+    handle, seed = history
+    assert rebuilds(handle, 'March 2023', month_frame(seed + 2)) == {}
+
+
+def test_margin_matrix_matches_a_full_rebuild(history):
+    handle, seed = history
+    rebuilds(handle, 'March 2023', month_frame(seed + 100))
+    frames = app.load_months(handle)
+    months = list(frames)
+    reference = pd.concat([pd.Series(df['Gross Margin %'].to_numpy(), index=app.month_column(df, 'MID'))
+                           for df in frames.values()], axis=1, keys=[f'{m} Margin %' for m in months])
+    changes = reference.diff(axis=1).iloc[:, 1:]
+    changes.columns = [f'Change_{prev}_{curr}' for prev, curr in zip(months, months[1:])]
+    pd.testing.assert_frame_equal(app.margin_matrix(handle, frames), pd.concat([reference, changes], axis=1))
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from app import filter_query_mask
+
+VIEW = pd.DataFrame({
+    'MID': ['100', '101', '102', '103'],
+    'DBA Name': ['Acme', '', None, 'Bob & Sons'],
+    'Gross Margin %': [1.5, np.nan, -2.0, 3.0],
+    'Total Volume': [10.0, 0.0, 7.0, 4.0],
+})
+
+
+def rows(filter_query):
+    return list(VIEW['MID'][filter_query_mask(VIEW, filter_query)])
+
+
+def test_comparisons_and_contains_combine():
+    assert rows('{Gross Margin %} > 0 && {DBA Name} icontains "acme"') == ['100']
+    assert rows('') == ['100', '101', '102', '103']
+
+
+def test_is_blank_and_is_nil():
+    assert rows('{DBA Name} is blank') == ['101', '102']
+    assert rows('{DBA Name} is nil') == ['102']
+    assert rows('{Gross Margin %} is blank') == ['101']
+    assert rows('{Gross Margin %} is nil && {Total Volume} = 0') == ['101']
+
+
+def test_type_and_parity_tests():
+    assert rows('{Gross Margin %} is num') == ['100', '102', '103']
+    assert rows('{DBA Name} is str') == ['100', '101', '103']
+    assert rows('{Total Volume} is even') == ['100', '101', '103']
+    assert rows('{Total Volume} is odd') == ['102']
+
+
+def test_unrecognized_clauses_match_no_rows():
+    assert rows('{Gross Margin %} is prime') == []
+    assert rows('{Unknown} > 1') == []
+    assert rows('{Gross Margin %} > 0 && not a clause') == []